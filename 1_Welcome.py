@@ -1,7 +1,9 @@
 import streamlit as st
 from  PIL import Image
 import os
-from auth import login_form, is_authenticated
+from auth import login_form, is_authenticated, logout
+from warmup import start_warmup
+from page_metrics import instrumented_page
 
 st.set_page_config(
     page_icon= "✨",
@@ -11,8 +13,13 @@ st.set_page_config(
 
 
 def main_page():
+    # Start loading the models in the background as soon as the app is opened
+    start_warmup()
     login_form()
     if is_authenticated():
+        if st.sidebar.button("Log out"):
+            logout()
+            st.experimental_rerun()
         st.write("Welcome!🎉")
 
 
@@ -94,4 +101,5 @@ def main_page():
      st.error("Please log in to access the App. Username: admin Password: Admin01")
 
 if __name__ == "__main__":
-    main_page()
+    with instrumented_page("welcome"):
+        main_page()
@@ -0,0 +1,79 @@
+import os
+import threading
+
+import joblib
+import numpy as np
+
+from dataset import CACHE_DIR, DATASET_PATH, load_table
+
+# Every dashboard count is a roll-up of this one small table (at most a few hundred rows)
+CUBE_DIMENSIONS = ["Contract", "PaymentMethod", "InternetService", "PhoneService", "SeniorCitizen", "Churn"]
+HISTOGRAM_BINS = 10
+
+_aggregates = {}
+_lock = threading.Lock()
+
+
+def _aggregates_path(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(CACHE_DIR, f"{name}.aggregates.joblib")
+
+
+# Counts, histograms and correlations the Dashboard needs, computed in one pass over the rows
+def build_aggregates(data, version=None):
+    cube = (
+        data.groupby(CUBE_DIMENSIONS, observed=True, dropna=False)
+        .size()
+        .rename("count")
+        .reset_index()
+    )
+    numeric = data.select_dtypes("number")
+    histograms = {}
+    for column in numeric.columns:
+        values = numeric[column].dropna().to_numpy()
+        histograms[column] = np.histogram(values, bins=HISTOGRAM_BINS)
+    return {
+        "version": version,
+        "rows": len(data),
+        "cube": cube,
+        "histograms": histograms,
+        "correlation": numeric.corr(),
+    }
+
+
+# Aggregates for the current dataset version, from memory, then disk, then a fresh build
+def load_aggregates(path=DATASET_PATH):
+    version, table = load_table(path)
+    with _lock:
+        cached = _aggregates.get(path)
+        if cached is not None and cached["version"] == version:
+            return cached
+        aggregates_path = _aggregates_path(path)
+        aggregates = None
+        if os.path.exists(aggregates_path):
+            aggregates = joblib.load(aggregates_path)
+        if aggregates is None or aggregates["version"] != version:
+            aggregates = build_aggregates(table.to_pandas(), version)
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            joblib.dump(aggregates, aggregates_path + ".tmp")
+            os.replace(aggregates_path + ".tmp", aggregates_path)
+        _aggregates[path] = aggregates
+        return aggregates
+
+
+# Row counts per combination of the given cube dimensions
+def counts(aggregates, by):
+    return aggregates["cube"].groupby(by, observed=True, dropna=False)["count"].sum().reset_index()
+
+
+# Share of all rows with Churn == "Yes"
+def churn_rate(aggregates):
+    churn = counts(aggregates, ["Churn"]).set_index("Churn")["count"]
+    return float(churn.get("Yes", 0) / aggregates["rows"]) if aggregates["rows"] else float("nan")
+
+
+# Same table pd.crosstab(data[index], data[columns]) would give
+def crosstab(aggregates, index, columns):
+    return aggregates["cube"].pivot_table(
+        index=index, columns=columns, values="count", aggfunc="sum", fill_value=0, observed=True
+    )
@@ -0,0 +1,117 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import joblib
+import numpy as np
+from sklearn.pipeline import Pipeline
+
+from pipelines import MODEL_PATHS, load_joblib_pipeline, predict_proba
+
+# Loading-optimized copies of models/*.joblib: the fitted preprocessing is dumped uncompressed
+# so its numeric arrays can be memory-mapped (and shared between processes), and a CatBoost
+# estimator is stored in CatBoost's native .cbm format instead of a pickle.
+OPTIMIZED_DIR = "models/optimized"
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _artifact_dir(name):
+    return os.path.join(OPTIMIZED_DIR, name)
+
+
+def _is_catboost(estimator):
+    return type(estimator).__module__.startswith("catboost")
+
+
+# Write the optimized layout for one model and check it predicts exactly like the joblib file
+def export(name, check_rows=None):
+    source = MODEL_PATHS[name]
+    pipeline = load_joblib_pipeline(source)
+    target = _artifact_dir(name)
+    tmp = target + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    *preprocessing, (estimator_name, estimator) = pipeline.steps
+    joblib.dump(Pipeline(preprocessing), os.path.join(tmp, "preprocessing.joblib"))
+    if _is_catboost(estimator):
+        estimator.save_model(os.path.join(tmp, "estimator.cbm"), format="cbm")
+        estimator_file = "estimator.cbm"
+    else:
+        joblib.dump(estimator, os.path.join(tmp, "estimator.joblib"))
+        estimator_file = "estimator.joblib"
+
+    manifest = {
+        "source": source,
+        "source_sha256": _sha256(source),
+        "estimator_step": estimator_name,
+        "estimator_file": estimator_file,
+        "exported_at": time.time(),
+    }
+    with open(os.path.join(tmp, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    if check_rows is not None:
+        exported = _load_dir(tmp, manifest)
+        if not np.array_equal(predict_proba(exported, check_rows), predict_proba(pipeline, check_rows)):
+            shutil.rmtree(tmp)
+            raise ValueError(f"Exported {name} does not reproduce the joblib pipeline's probabilities")
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+    return target
+
+
+def _load_dir(directory, manifest, mmap_mode="r"):
+    preprocessing = joblib.load(os.path.join(directory, "preprocessing.joblib"), mmap_mode=mmap_mode)
+    estimator_path = os.path.join(directory, manifest["estimator_file"])
+    if estimator_path.endswith(".cbm"):
+        from catboost import CatBoostClassifier
+
+        estimator = CatBoostClassifier()
+        estimator.load_model(estimator_path, format="cbm")
+    else:
+        estimator = joblib.load(estimator_path, mmap_mode=mmap_mode)
+    return Pipeline(preprocessing.steps + [(manifest["estimator_step"], estimator)])
+
+
+# The optimized pipeline for a model, or None when it hasn't been exported or its
+# joblib source has changed since the export
+def load_optimized(name):
+    directory = _artifact_dir(name)
+    try:
+        with open(os.path.join(directory, "manifest.json")) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest["source_sha256"] != _sha256(MODEL_PATHS[name]):
+        return None
+    return _load_dir(directory, manifest)
+
+
+def main():
+    from dataset import load_dataset
+
+    parser = argparse.ArgumentParser(description="Export models/*.joblib to the loading-optimized layout.")
+    parser.add_argument("--model", choices=list(MODEL_PATHS), action="append", help="model to export (default: all)")
+    args = parser.parse_args()
+
+    data = load_dataset()
+    for name in args.model or MODEL_PATHS:
+        target = export(name, check_rows=data)
+        size = sum(os.path.getsize(os.path.join(target, f)) for f in os.listdir(target))
+        print(f"{name}: wrote {target} ({size / 1024:.0f} KB), probabilities match on {len(data)} rows")
+
+
+if __name__ == "__main__":
+    main()
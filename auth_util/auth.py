@@ -1,5 +1,10 @@
 
+import json
+import time
+from http.cookies import CookieError, SimpleCookie
+
 import streamlit as st
+import streamlit.components.v1 as components
 
 css = """
 <style>
@@ -42,39 +47,124 @@ css = """
 </style>
 """
 
+# Cookie carrying the session token, so a reload or a request landing on another replica
+# stays logged in. Unlike a query parameter it never appears in links, browser history or
+# access logs.
+SESSION_COOKIE = "churn_session"
+
+
+def _websocket_headers():
+    # Streamlit 1.14 has no public API for request cookies; the headers of the session's
+    # websocket handshake carry them. Outside a running server there are none.
+    try:
+        from streamlit.web.server.websocket_headers import _get_websocket_headers
+
+        return _get_websocket_headers() or {}
+    except Exception:
+        return {}
+
+
+# The session token in the request's cookie, or None
+def cookie_token(headers=None):
+    headers = _websocket_headers() if headers is None else headers
+    header = next((value for name, value in headers.items() if name.lower() == "cookie"), None)
+    if not header:
+        return None
+    try:
+        morsel = SimpleCookie(header).get(SESSION_COOKIE)
+    except CookieError:
+        return None
+    return morsel.value if morsel is not None else None
+
+
+# Set (or with max_age 0, clear) the session cookie from the browser. Component iframes share
+# the app's origin, so the cookie is sent with every later page load to any replica.
+def _write_cookie(token, max_age):
+    components.html(
+        "<script>document.cookie = " + json.dumps(f"{SESSION_COOKIE}={token}; path=/; max-age={int(max_age)}; SameSite=Strict")
+        + ' + (window.location.protocol === "https:" ? "; Secure" : "");</script>',
+        height=0,
+    )
+
+
 def authenticate(username, password):
-   
-    if username == "admin" and password == "Admin01":
-        return True
-    else:
-        return False
+    from sessions import get_session_store
+
+    return get_session_store().authenticate(username, password) is not None
+
+
+# The logged-in user's claims ({"user", "role", "exp"}) or None, from the token in the tab's
+# session state, else from the session cookie; either way a cached HMAC check.
+def current_session():
+    from sessions import get_session_store
+
+    token = st.session_state.get("token")
+    from_cookie = token is None
+    if from_cookie:
+        token = cookie_token()
+    claims = get_session_store().validate(token) if token else None
+    if claims is None:
+        st.session_state["authenticated"] = False
+        st.session_state.pop("token", None)
+        if from_cookie and token:
+            # Expired or revoked: clear it once, not on every rerun
+            st.session_state["stale_cookie"] = token
+        return None
+    st.session_state["token"] = token
+    st.session_state["user"] = claims["user"]
+    st.session_state["role"] = claims["role"]
+    st.session_state["authenticated"] = True
+    return claims
+
 
 def login_form():
+    # Already logged in: nothing is rendered, not even the CSS
+    if current_session() is not None:
+        return
+
+    stale = st.session_state.pop("stale_cookie", None)
+    if stale is not None and st.session_state.get("cleared_cookie") != stale:
+        st.session_state["cleared_cookie"] = stale
+        _write_cookie("", 0)
+
     st.markdown(css, unsafe_allow_html=True)
+    with st.container():
+        st.markdown("<div class='auth-title'>Login</div>", unsafe_allow_html=True)
+        username = st.text_input("Username:", key="username")
+        password = st.text_input("Password:", type="password", key="password")
+        st.markdown("<div class='auth-input'></div>", unsafe_allow_html=True)
+        st.markdown("<div class='auth-input'></div>", unsafe_allow_html=True)
+        st.markdown("<div class='auth-button'></div>", unsafe_allow_html=True)
+        login_button = st.button("Login")
+        st.markdown("</div>", unsafe_allow_html=True)
+
+        if login_button:
+            from sessions import get_session_store
+
+            token = get_session_store().login(username, password)
+            if token is not None:
+                st.session_state["token"] = token
+                claims = current_session()
+                _write_cookie(token, claims["exp"] - time.time())
+                st.success("Successfully logged in!")
+            else:
+                st.error("Invalid username or password.")
 
-    if "authenticated" not in st.session_state:
-        st.session_state["authenticated"] = False
 
-    if not st.session_state["authenticated"]:
-        with st.container():
-            st.markdown("<div class='auth-title'>Login</div>", unsafe_allow_html=True)
-            username = st.text_input("Username:", key="username")
-            password = st.text_input("Password:", type="password", key="password")
-            st.markdown("<div class='auth-input'></div>", unsafe_allow_html=True)
-            st.markdown("<div class='auth-input'></div>", unsafe_allow_html=True)
-            st.markdown("<div class='auth-button'></div>", unsafe_allow_html=True)
-            login_button = st.button("Login")
-            st.markdown("</div>", unsafe_allow_html=True)
-
-            if login_button:
-                if authenticate(username, password):
-                    st.session_state["authenticated"] = True
-                    st.success("Successfully logged in!")
-                else:
-                    st.error("Invalid username or password.")
-    else:
-        st.write(" ")
+# Revoke the session everywhere; the login form clears the now stale cookie on the next run
+def logout():
+    from sessions import get_session_store
+
+    token = st.session_state.pop("token", None)
+    if token is not None:
+        get_session_store().revoke(token=token)
+    for key in ("authenticated", "user", "role"):
+        st.session_state.pop(key, None)
+
 
 def is_authenticated():
     return st.session_state.get("authenticated", False)
 
+
+def is_admin():
+    return is_authenticated() and st.session_state.get("role") == "admin"
@@ -0,0 +1,110 @@
+import argparse
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from compare import Agreement, score_frame
+from pipelines import MODEL_PATHS, CATEGORICAL_COLUMNS, load_pipeline, label_from_proba
+
+DEFAULT_CHUNKSIZE = 50_000
+
+
+def _is_parquet(name):
+    return str(name).lower().endswith((".parquet", ".pq"))
+
+
+# Yield the input file as DataFrame chunks without loading the whole file
+def read_chunks(source, chunksize=DEFAULT_CHUNKSIZE, name=None):
+    name = name or getattr(source, "name", source)
+    if _is_parquet(name):
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        # Text columns are read as object so an all-empty chunk is not parsed as float
+        dtype = {column: object for column in CATEGORICAL_COLUMNS}
+        yield from pd.read_csv(source, chunksize=chunksize, dtype=dtype)
+
+
+# Appends scored chunks to a CSV or Parquet target as they are produced
+class ChunkWriter:
+    def __init__(self, target, name=None):
+        self.target = target
+        self.parquet = _is_parquet(name or getattr(target, "name", target))
+        self.writer = None
+        self.rows = 0
+
+    def write(self, df):
+        if self.parquet:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.target, table.schema)
+            self.writer.write_table(table.cast(self.writer.schema))
+        else:
+            df.to_csv(self.target, mode="w" if self.rows == 0 else "a", header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+# Score every chunk of source with the given models. Each chunk is preprocessed once when the
+# models share their fitted preprocessing, and the estimators then score it concurrently.
+# Returns ({model: {"rows", "seconds", "rows_per_second"}}, agreement summary or None):
+# stats are measured over model time only, with a "preprocessing" entry when it was shared;
+# with compare=True the agreement and latency summary is collected in the same pass.
+def score_file(source, target, models=tuple(MODEL_PATHS), chunksize=DEFAULT_CHUNKSIZE,
+               source_name=None, target_name=None, compare=False):
+    pipelines = {model: load_pipeline(model) for model in models}
+    stats = {}
+    agreement = Agreement(models) if compare else None
+    writer = ChunkWriter(target, target_name)
+    try:
+        for chunk in read_chunks(source, chunksize, source_name):
+            probabilities, timings = score_frame(pipelines, chunk)
+            scored = chunk.copy()
+            for model in models:
+                scored[f"{model}_probability"] = probabilities[model].to_numpy()
+                scored[f"{model}_prediction"] = label_from_proba(probabilities[model].to_numpy())
+            for key, seconds in timings.items():
+                if seconds is not None:
+                    result = stats.setdefault(key, {"rows": 0, "seconds": 0.0})
+                    result["rows"] += len(chunk)
+                    result["seconds"] += seconds
+            if agreement is not None:
+                agreement.add(probabilities, timings)
+            writer.write(scored)
+    finally:
+        writer.close()
+
+    for result in stats.values():
+        result["rows_per_second"] = result["rows"] / result["seconds"] if result["seconds"] else 0.0
+    return stats, agreement.summary() if agreement is not None else None
+
+
+def format_stats(stats):
+    return "\n".join(
+        f"{model}: {result['rows']} rows in {result['seconds']:.2f}s ({result['rows_per_second']:,.0f} rows/s)"
+        for model, result in stats.items()
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet file of customers in chunks.")
+    parser.add_argument("input", help="CSV or Parquet file with the Predict form columns")
+    parser.add_argument("output", help="CSV or Parquet file to write the scored rows to")
+    parser.add_argument("--model", choices=list(MODEL_PATHS), action="append",
+                        help="model to score with (repeatable, default: all)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    stats, _ = score_file(args.input, args.output, models=args.model or tuple(MODEL_PATHS), chunksize=args.chunksize)
+    print(format_stats(stats))
+
+
+if __name__ == "__main__":
+    main()
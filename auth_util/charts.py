@@ -0,0 +1,104 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import plotly.express as px
+import seaborn as sns
+
+from aggregates import churn_rate, counts, crosstab
+
+# Figures for the Dashboard, drawn from the precomputed aggregates rather than the raw rows
+
+
+def feature_distribution_figure(aggregates):
+    histograms = aggregates["histograms"]
+    columns = sorted(histograms)
+    ncols = int(np.ceil(np.sqrt(len(columns))))
+    nrows = int(np.ceil(len(columns) / ncols))
+    fig, axes = plt.subplots(nrows, ncols, figsize=(12, 8), squeeze=False)
+    for ax, column in zip(axes.flat, columns):
+        heights, edges = histograms[column]
+        ax.bar(edges[:-1], heights, width=np.diff(edges), align="edge", color="skyblue")
+        ax.set_title(column)
+    for ax in list(axes.flat)[len(columns):]:
+        ax.set_visible(False)
+    plt.tight_layout()
+    return fig
+
+
+def churn_by_figure(aggregates, column, title, barmode="relative"):
+    fig = px.bar(
+        counts(aggregates, [column, "Churn"]), x=column, y="count", color="Churn", barmode=barmode,
+        color_discrete_map={"Yes": "orange", "No": "blue"} if barmode == "group" else None,
+    )
+    fig.update_layout(title=title)
+    return fig
+
+
+def distribution_figure(aggregates, column, title):
+    data = counts(aggregates, [column])
+    data[column] = data[column].astype(str)
+    return px.bar(data, x=column, y="count", color=column, title=title)
+
+
+def correlation_figure(aggregates):
+    return px.imshow(aggregates["correlation"], color_continuous_scale='icefire')
+
+
+def contingency_figure(aggregates, index, columns):
+    table = crosstab(aggregates, index, columns)
+    if isinstance(columns, list):
+        table.columns = [" / ".join(str(level) for level in column) for column in table.columns]
+    return px.imshow(table, color_continuous_scale='icefire')
+
+
+def service_by_contract_figure(aggregates):
+    fig, axes = plt.subplots(1, 2, figsize=(12, 6))
+    sns.barplot(x='Contract', y='count', hue='InternetService', data=counts(aggregates, ['Contract', 'InternetService']),
+                palette={'Fiber optic': 'orange', 'DSL': 'blue', 'No': 'red'}, ax=axes[0])
+    axes[0].set_title('Internet Service by Contract Term')
+    sns.barplot(x='Contract', y='count', hue='PhoneService', data=counts(aggregates, ['Contract', 'PhoneService']),
+                palette={"Yes": 'orange', "No": 'blue'}, ax=axes[1])
+    axes[1].set_title('Phone Service by Contract Term')
+    return fig
+
+
+def live_rates_figure(table, dimension):
+    data = table.melt(id_vars=[dimension], value_vars=["training_churn_rate", "predicted_churn_rate"],
+                      var_name="source", value_name="churn_rate")
+    return px.bar(data, x=dimension, y="churn_rate", color="source", barmode="group",
+                  title=f"Churn Rate by {dimension}: Training Data vs Predictions")
+
+
+def importance_figure(importance, model):
+    data = importance.reset_index().rename(columns={"index": "feature"}).iloc[::-1]
+    return px.bar(data, x="mean_abs_contribution", y="feature", orientation="h",
+                  title=f"{model}: Mean Absolute Contribution to Churn Log-odds")
+
+
+def drivers_figure(drivers):
+    data = drivers.iloc[::-1]
+    return px.bar(data, x="contribution", y="feature", color="effect", orientation="h",
+                  color_discrete_map={"raises churn risk": "orange", "lowers churn risk": "blue"},
+                  title="Top Churn Drivers for this Customer")
+
+
+def drift_scores_figure(scores):
+    data = scores.dropna(subset=["psi"])
+    return px.bar(data, x="feature", y="psi", color="status",
+                  color_discrete_map={"stable": "green", "moderate": "orange", "significant": "red"},
+                  title="Population Stability Index: Predictions vs Training Data")
+
+
+def drift_distribution_figure(table, column):
+    data = table.melt(id_vars=["bin"], value_vars=["reference", "live"], var_name="source", value_name="share")
+    return px.bar(data, x="bin", y="share", color="source", barmode="group",
+                  title=f"{column}: Training Data vs Predictions")
+
+
+# Numbers for the KPI row, all from the Churn counts of the cube
+def kpis(aggregates):
+    churn = counts(aggregates, ["Churn"]).set_index("Churn")["count"]
+    total_customers = aggregates["rows"]
+    churn_customers = int(churn.get("Yes", 0))
+    non_churn_customers = int(churn.get("No", 0))
+    churn_rate_percent = round(churn_rate(aggregates) * 100, 2)
+    return total_customers, churn_customers, non_churn_customers, churn_rate_percent
@@ -0,0 +1,96 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+from pipelines import predict_proba
+
+# Collect requests for up to this long (or this many rows) before scoring them together
+BATCH_WINDOW_MS = float(os.environ.get("CHURN_BATCH_WINDOW_MS", 5))
+BATCH_MAX_SIZE = int(os.environ.get("CHURN_BATCH_MAX_SIZE", 64))
+
+
+# Coalesces predict_proba calls from many sessions/threads into one call per pipeline per window
+class Coalescer:
+    def __init__(self, window_ms=BATCH_WINDOW_MS, max_batch_size=BATCH_MAX_SIZE):
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.requests = queue.Queue()
+        self.batches = 0
+        self.rows = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="churn-coalescer", daemon=True)
+                self._thread.start()
+
+    # Queue a DataFrame of customers; the future resolves to their churn probabilities
+    def submit(self, pipeline, df):
+        if self._thread is None:
+            self._start()
+        future = Future()
+        self.requests.put((pipeline, df, future))
+        return future
+
+    def predict_proba(self, pipeline, df, timeout=None):
+        return self.submit(pipeline, df).result(timeout)
+
+    def _collect(self):
+        batch = [self.requests.get()]
+        rows = len(batch[0][1])
+        deadline = time.monotonic() + self.window
+        while rows < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            rows += len(item[1])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            groups = {}
+            for item in batch:
+                groups.setdefault(id(item[0]), []).append(item)
+            for items in groups.values():
+                self._score(items)
+
+    def _score(self, items):
+        items = [item for item in items if item[2].set_running_or_notify_cancel()]
+        if not items:
+            return
+        try:
+            frame = pd.concat([df for _, df, _ in items], ignore_index=True)
+            # A lone row skips pandas entirely when the pipeline has a verified compiled plan
+            from fast_path import compiled_for
+            compiled = compiled_for(items[0][0]) if len(frame) == 1 else None
+            if compiled is not None:
+                probabilities = np.array([compiled.predict_proba_row(frame.iloc[0].to_dict())])
+            else:
+                probabilities = predict_proba(items[0][0], frame)
+        except Exception as e:  # every waiting caller gets the error
+            for _, _, future in items:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.rows += len(frame)
+        start = 0
+        for _, df, future in items:
+            future.set_result(probabilities[start:start + len(df)])
+            start += len(df)
+
+
+# Process-wide instance shared by every Streamlit session
+coalescer = Coalescer()
@@ -0,0 +1,154 @@
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from pipelines import MODEL_PATHS, load_pipeline, prepare_features, label_from_proba
+from util import log1p_transform
+
+# Scores several pipelines on the same customers: when their fitted preprocessing is
+# identical it runs once, and the final estimators then score concurrently
+
+# CatBoost and numpy release the GIL while scoring, so threads are enough
+_executor = ThreadPoolExecutor(max_workers=len(MODEL_PATHS), thread_name_prefix="churn-compare")
+
+# Fingerprints of fitted preprocessing, keyed by pipeline object
+_fingerprints = {}
+_lock = threading.Lock()
+
+
+def preprocessing_fingerprint(pipeline):
+    with _lock:
+        cached = _fingerprints.get(id(pipeline))
+        if cached is not None and cached[0] is pipeline:
+            return cached[1]
+        fingerprint = joblib.hash(pipeline[:-1])
+        _fingerprints[id(pipeline)] = (pipeline, fingerprint)
+        return fingerprint
+
+
+def shares_preprocessing(pipelines):
+    return len({preprocessing_fingerprint(pipeline) for pipeline in pipelines.values()}) == 1
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+# Churn probabilities of every pipeline for the rows of df, plus timings in seconds:
+# {"preprocessing": shared time or None, "<model>": that model's own time}
+def score_frame(pipelines, df):
+    X = log1p_transform(prepare_features(df))
+    timings = {"preprocessing": None}
+    if shares_preprocessing(pipelines):
+        first = next(iter(pipelines.values()))
+        features, timings["preprocessing"] = _timed(first[:-1].transform, X)
+        futures = {name: _executor.submit(_timed, pipeline[-1].predict_proba, features)
+                   for name, pipeline in pipelines.items()}
+    else:
+        futures = {name: _executor.submit(_timed, pipeline.predict_proba, X) for name, pipeline in pipelines.items()}
+    probabilities = {}
+    for name, future in futures.items():
+        proba, timings[name] = future.result()
+        probabilities[name] = proba[:, 1]
+    return pd.DataFrame(probabilities, index=df.index), timings
+
+
+# Same for one customer dict; the shared features come from the compiled fast path when it
+# is available, which is far cheaper than a one-row DataFrame through the preprocessing
+def score_row(pipelines, row):
+    from fast_path import compiled_for
+
+    compiled = compiled_for(next(iter(pipelines.values())))
+    if compiled is None or not shares_preprocessing(pipelines):
+        probabilities, timings = score_frame(pipelines, pd.DataFrame([row]))
+        return probabilities.iloc[0].to_dict(), timings
+    timings = {}
+    features, timings["preprocessing"] = _timed(compiled.features, row)
+    futures = {name: _executor.submit(_timed, pipeline[-1].predict_proba, features)
+               for name, pipeline in pipelines.items()}
+    probabilities = {}
+    for name, future in futures.items():
+        proba, timings[name] = future.result()
+        probabilities[name] = float(proba[0, 1])
+    return probabilities, timings
+
+
+# Agreement between the models' labels and probabilities, from running sums so batches can be combined
+class Agreement:
+    def __init__(self, models):
+        self.models = list(models)
+        self.rows = 0
+        self.agree = 0
+        self.churn = {model: 0 for model in self.models}
+        self.abs_diff_sum = 0.0
+        self.max_abs_diff = 0.0
+        self.seconds = {model: 0.0 for model in ["preprocessing"] + self.models}
+
+    def add(self, probabilities, timings):
+        labels = {model: label_from_proba(probabilities[model].to_numpy()) for model in self.models}
+        stacked = np.vstack([labels[model] for model in self.models])
+        self.rows += len(probabilities)
+        self.agree += int((stacked == stacked[0]).all(axis=0).sum())
+        for model in self.models:
+            self.churn[model] += int(labels[model].sum())
+        if len(self.models) > 1:
+            values = probabilities[self.models].to_numpy()
+            spread = values.max(axis=1) - values.min(axis=1)
+            self.abs_diff_sum += float(spread.sum())
+            self.max_abs_diff = max(self.max_abs_diff, float(spread.max(initial=0.0)))
+        for key, seconds in timings.items():
+            if seconds is not None:
+                self.seconds[key] += seconds
+        return self
+
+    def summary(self):
+        rows = self.rows or 1
+        return {
+            "rows": self.rows,
+            "agreement_rate": self.agree / rows,
+            "mean_abs_difference": self.abs_diff_sum / rows,
+            "max_abs_difference": self.max_abs_diff,
+            "churn_rate": {model: self.churn[model] / rows for model in self.models},
+            "ms_per_row": {key: 1000 * seconds / rows for key, seconds in self.seconds.items() if seconds},
+        }
+
+
+# Compare the models over a whole CSV/Parquet file, one shared preprocessing per chunk
+def compare_file(source, models=tuple(MODEL_PATHS), chunksize=None, source_name=None):
+    from batch import DEFAULT_CHUNKSIZE, read_chunks
+
+    pipelines = {model: load_pipeline(model) for model in models}
+    agreement = Agreement(models)
+    for chunk in read_chunks(source, chunksize or DEFAULT_CHUNKSIZE, source_name):
+        agreement.add(*score_frame(pipelines, chunk))
+    return agreement.summary()
+
+
+def format_summary(summary):
+    lines = [
+        f"{summary['rows']} rows, labels agree on {summary['agreement_rate']:.1%}",
+        f"probability difference: mean {summary['mean_abs_difference']:.4f}, max {summary['max_abs_difference']:.4f}",
+    ]
+    lines += [f"{model}: churn rate {rate:.1%}" for model, rate in summary["churn_rate"].items()]
+    lines += [f"{key}: {ms:.4f} ms/row" for key, ms in summary["ms_per_row"].items()]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the models' predictions and latency on a customers file.")
+    parser.add_argument("input", help="CSV or Parquet file with the Predict form columns")
+    parser.add_argument("--chunksize", type=int)
+    args = parser.parse_args()
+
+    print(format_summary(compare_file(args.input, chunksize=args.chunksize)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+import argparse
+import math
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from dataset import DATASET_PATH, ID_COLUMNS, dataset_version, load_dataset, load_table
+from pipelines import NUMERIC_COLUMNS
+
+# Where customer data comes from: the xlsx (default), a SQLite file for local testing, or a
+# SQL database through pyodbc. SQL sources share one connection pool per process and push
+# column projection, filters, sorting and paging down into the queries.
+#
+#   CHURN_DATA_SOURCE=excel | sqlite | odbc
+#   CHURN_SQLITE_PATH=Data/customers.db
+#   CHURN_ODBC_CONNECTION="DRIVER={ODBC Driver 18 for SQL Server};SERVER=...;DATABASE=...;UID=...;PWD=..."
+
+DATA_SOURCE = os.environ.get("CHURN_DATA_SOURCE", "excel")
+SQLITE_PATH = os.environ.get("CHURN_SQLITE_PATH", "Data/customers.db")
+ODBC_CONNECTION = os.environ.get("CHURN_ODBC_CONNECTION")
+DATA_TABLE = os.environ.get("CHURN_DATA_TABLE", "customers")
+POOL_SIZE = int(os.environ.get("CHURN_DB_POOL_SIZE", "4"))
+# Seconds to wait for a free connection when all POOL_SIZE are in use
+POOL_TIMEOUT = float(os.environ.get("CHURN_DB_POOL_TIMEOUT", "30"))
+
+FETCH_SIZE = 10_000
+# SQL tables have no file to fingerprint, so derived data is rebuilt after this many seconds
+SQL_REFRESH_SECONDS = 300
+
+
+# At most `size` open connections, handed out one at a time and reused across reruns and sessions
+class ConnectionPool:
+    def __init__(self, connect, size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+        self.lock = threading.Lock()
+
+    def _discard(self, conn):
+        with self.lock:
+            self.opened -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                can_open = self.opened < self.size
+                if can_open:
+                    self.opened += 1
+            if can_open:
+                try:
+                    conn = self.connect()
+                except BaseException:
+                    with self.lock:
+                        self.opened -= 1
+                    raise
+            else:
+                try:
+                    conn = self.idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No database connection became free within {self.timeout:g}s; "
+                                       f"all {self.size} are in use (CHURN_DB_POOL_SIZE)") from None
+        try:
+            yield conn
+        except GeneratorExit:
+            # A chunked read abandoned by its caller; its cursor is already closed, so the
+            # connection is still good
+            self.idle.put(conn)
+            raise
+        except BaseException:
+            # The connection may be broken (or interrupted mid-query, e.g. KeyboardInterrupt or a
+            # Streamlit rerun); close it and let the pool open a fresh one later
+            self._discard(conn)
+            raise
+        else:
+            self.idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn)
+
+
+class ExcelSource:
+    name = "excel"
+
+    def __init__(self, path=DATASET_PATH):
+        self.path = path
+
+    def version(self):
+        return dataset_version(self.path)
+
+    # Yield DataFrame chunks of the selected columns and rows
+    def read(self, columns=None, filters=None, chunksize=FETCH_SIZE):
+        from explorer import filter_mask
+
+        _, table = load_table(self.path)
+        mask = filter_mask(table, filters or {})
+        if mask is not None:
+            table = table.filter(mask)
+        if columns is not None:
+            table = table.select(columns)
+        for batch in table.to_batches(max_chunksize=chunksize):
+            yield batch.to_pandas()
+
+    def load(self, columns=None, filters=None):
+        if not filters:
+            return load_dataset(self.path, columns)
+        return pd.concat(list(self.read(columns, filters)), ignore_index=True)
+
+    def page(self, filters=None, sort_by=None, ascending=True, offset=0, limit=50):
+        from explorer import query_page
+
+        return query_page(filters, sort_by, ascending, offset, limit, path=self.path)
+
+    def summaries(self):
+        from explorer import load_summaries
+
+        return load_summaries(self.path)
+
+    def aggregates(self):
+        from aggregates import load_aggregates
+
+        return load_aggregates(self.path)
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class SQLSource:
+    # dialect is "sqlite" or "mssql"; both drivers use qmark (?) parameters
+    def __init__(self, name, pool, table=DATA_TABLE, dialect="sqlite"):
+        self.name = name
+        self.pool = pool
+        self.table = table
+        self.dialect = dialect
+        self._columns = None
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def columns(self):
+        if self._columns is None:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT * FROM {_quote(self.table)} WHERE 1 = 0")
+                self._columns = [d[0] for d in cursor.description]
+                cursor.close()
+        return self._columns
+
+    def _column(self, name):
+        # Column names go into the SQL text, so only names the table really has are accepted
+        if name not in self.columns():
+            raise ValueError(f"Unknown column {name!r} in {self.table}")
+        return _quote(name)
+
+    def _where(self, filters):
+        clauses, params = [], []
+        for column, (kind, value) in sorted((filters or {}).items()):
+            quoted = self._column(column)
+            if kind == "in":
+                value = list(value)
+                if not value:
+                    clauses.append("1 = 0")
+                    continue
+                clauses.append(f"{quoted} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            elif kind == "range":
+                clauses.append(f"{quoted} BETWEEN ? AND ?")
+                params.extend(value)
+            elif kind == "contains":
+                escaped = value.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                clauses.append(f"LOWER({quoted}) LIKE ? ESCAPE '\\'")
+                params.append(f"%{escaped}%")
+            else:
+                raise ValueError(f"Unknown filter {kind!r} on {column}")
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _select(self, columns):
+        return ", ".join(self._column(c) for c in columns or self.columns())
+
+    def _fetch(self, sql, params, columns, chunksize):
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(sql, params)
+                names = columns or [d[0] for d in cursor.description]
+                while True:
+                    rows = cursor.fetchmany(chunksize)
+                    if not rows:
+                        break
+                    yield pd.DataFrame.from_records([tuple(row) for row in rows], columns=names)
+            finally:
+                cursor.close()
+
+    def read(self, columns=None, filters=None, chunksize=FETCH_SIZE):
+        where, params = self._where(filters)
+        sql = f"SELECT {self._select(columns)} FROM {_quote(self.table)}{where}"
+        yield from self._fetch(sql, params, columns, chunksize)
+
+    def load(self, columns=None, filters=None):
+        chunks = list(self.read(columns, filters))
+        return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns or self.columns())
+
+    def _scalar_rows(self, sql, params=()):
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(sql, params)
+                return [tuple(row) for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+
+    def page(self, filters=None, sort_by=None, ascending=True, offset=0, limit=50):
+        where, params = self._where(filters)
+        total = self._scalar_rows(f"SELECT COUNT(*) FROM {_quote(self.table)}{where}", params)[0][0]
+        if sort_by is not None:
+            quoted = self._column(sort_by)
+            # Missing values last in both directions, like the Excel explorer
+            order = f" ORDER BY CASE WHEN {quoted} IS NULL THEN 1 ELSE 0 END, {quoted} {'ASC' if ascending else 'DESC'}"
+        else:
+            order = " ORDER BY (SELECT NULL)" if self.dialect == "mssql" else ""
+        if self.dialect == "mssql":
+            paging = " OFFSET ? ROWS FETCH NEXT ? ROWS ONLY"
+            page_params = [offset, limit]
+        else:
+            paging = " LIMIT ? OFFSET ?"
+            page_params = [limit, offset]
+        sql = f"SELECT {self._select(None)} FROM {_quote(self.table)}{where}{order}{paging}"
+        chunks = list(self._fetch(sql, params + page_params, None, limit or 1))
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=self.columns())
+        return df, total
+
+    # Derived data is rebuilt at most every SQL_REFRESH_SECONDS and shared by all sessions
+    def _cached(self, name, build):
+        with self._lock:
+            cached = self._derived.get(name)
+            if cached is not None and time.time() - cached[0] < SQL_REFRESH_SECONDS:
+                return cached[1]
+            value = build(f"{self.name}:{self.table}@{int(time.time())}")
+            self._derived[name] = (time.time(), value)
+            return value
+
+    def version(self):
+        return self._cached("version", lambda version: version)
+
+    # describe()-style statistics computed by the database, one aggregate query per column
+    def summaries(self):
+        def build(version):
+            table = _quote(self.table)
+            columns = {}
+            for name in self.columns():
+                quoted = _quote(name)
+                if name in NUMERIC_COLUMNS:
+                    count, mean, low, high, mean_square = self._scalar_rows(
+                        f"SELECT COUNT({quoted}), AVG(1.0 * {quoted}), MIN({quoted}), MAX({quoted}), "
+                        f"AVG(1.0 * {quoted} * {quoted}) FROM {table}")[0]
+                    std = None
+                    if count and count > 1:
+                        std = math.sqrt(max(0.0, (mean_square - mean * mean) * count / (count - 1)))
+                    stats = {"count": count, "mean": mean, "std": std, "min": low, "max": high}
+                    columns[name] = {"stats": stats, "values": None}
+                elif name in ID_COLUMNS:
+                    count, unique = self._scalar_rows(f"SELECT COUNT({quoted}), COUNT(DISTINCT {quoted}) FROM {table}")[0]
+                    columns[name] = {"stats": {"count": count, "unique": unique, "top": None, "freq": None}, "values": None}
+                else:
+                    counts = self._scalar_rows(
+                        f"SELECT {quoted}, COUNT(*) FROM {table} WHERE {quoted} IS NOT NULL GROUP BY {quoted}")
+                    top = max(counts, key=lambda c: c[1], default=(None, None))
+                    stats = {"count": sum(c[1] for c in counts), "unique": len(counts), "top": top[0], "freq": top[1]}
+                    columns[name] = {"stats": stats, "values": sorted(str(c[0]) for c in counts)}
+            return {"version": version, "columns": columns}
+
+        return self._cached("summaries", build)
+
+    # Dashboard aggregates from only the columns they need, fetched in chunks
+    def aggregates(self):
+        from aggregates import CUBE_DIMENSIONS, build_aggregates
+
+        numeric = [c for c in self.columns() if c in NUMERIC_COLUMNS]
+        columns = list(dict.fromkeys(CUBE_DIMENSIONS + numeric))
+        return self._cached("aggregates", lambda version: build_aggregates(self.load(columns), version))
+
+
+def _sqlite_connect(path):
+    import sqlite3
+
+    # Pooled connections are used from whichever Streamlit thread takes them
+    return lambda: sqlite3.connect(path, check_same_thread=False)
+
+
+def _odbc_connect(connection_string):
+    import pyodbc
+
+    return lambda: pyodbc.connect(connection_string)
+
+
+_source = None
+_source_lock = threading.Lock()
+
+
+# The configured data source, created once per process so its pool outlives reruns
+def get_source():
+    global _source
+    with _source_lock:
+        if _source is None:
+            if DATA_SOURCE == "excel":
+                _source = ExcelSource()
+            elif DATA_SOURCE == "sqlite":
+                _source = SQLSource("sqlite", ConnectionPool(_sqlite_connect(SQLITE_PATH)), dialect="sqlite")
+            elif DATA_SOURCE == "odbc":
+                if not ODBC_CONNECTION:
+                    raise ValueError("CHURN_DATA_SOURCE=odbc needs CHURN_ODBC_CONNECTION")
+                _source = SQLSource("odbc", ConnectionPool(_odbc_connect(ODBC_CONNECTION)), dialect="mssql")
+            else:
+                raise ValueError(f"Unknown CHURN_DATA_SOURCE {DATA_SOURCE!r}")
+        return _source
+
+
+# Copy the xlsx into a SQLite table to use as a local stand-in for the customer database
+def export_sqlite(path=SQLITE_PATH, table=DATA_TABLE):
+    import sqlite3
+
+    data = load_dataset()
+    # Plain Python strings for sqlite3; astype returns a new frame, the shared one is untouched
+    data = data.astype({column: object for column in data.columns if not pd.api.types.is_numeric_dtype(data[column])})
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with sqlite3.connect(path) as conn:
+        data.to_sql(table, conn, if_exists="replace", index=False, chunksize=FETCH_SIZE)
+        for column in ("Contract", "Churn"):
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {_quote(f'idx_{table}_{column}')} "
+                         f"ON {_quote(table)} ({_quote(column)})")
+    return len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the configured data source or create the SQLite stand-in.")
+    parser.add_argument("--export-sqlite", metavar="PATH", nargs="?", const=SQLITE_PATH,
+                        help=f"copy the xlsx into a SQLite table (default path: {SQLITE_PATH})")
+    args = parser.parse_args()
+
+    if args.export_sqlite:
+        rows = export_sqlite(args.export_sqlite)
+        print(f"Wrote {rows} rows to {args.export_sqlite} (table {DATA_TABLE})")
+        return
+    source = get_source()
+    _, total = source.page(limit=1)
+    print(f"{source.name}: {total} customers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+
+DATASET_PATH = "Dataset/Lp2_df_coc.xlsx"
+CACHE_DIR = "Dataset/.cache"
+
+# Columns kept as plain strings; every other text column becomes a dictionary (categorical) column
+ID_COLUMNS = ["customerID"]
+
+# Bumped whenever _build writes a different layout, so older cache files are rebuilt
+CACHE_FORMAT = 2
+
+# One columnar copy per source file, shared by every page and session in this process
+_tables = {}
+# One read-only DataFrame over each table, see load_dataset
+_frames = {}
+_lock = threading.Lock()
+
+
+def _cache_paths(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return (
+        os.path.join(CACHE_DIR, f"{name}.arrow"),
+        os.path.join(CACHE_DIR, f"{name}.meta.json"),
+    )
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta_path, meta):
+    tmp_path = meta_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+# Smallest dtypes that hold exactly the same values: text as categoricals, integers downcast,
+# and floats as float32 only where every value survives the round trip
+def compact(df):
+    df = df.copy()
+    for column in df.columns:
+        values = df[column]
+        if values.dtype == object and column not in ID_COLUMNS:
+            df[column] = values.astype("category")
+        elif pd.api.types.is_integer_dtype(values):
+            df[column] = pd.to_numeric(values, downcast="integer")
+        elif pd.api.types.is_float_dtype(values) and values.dtype != "float32":
+            narrow = values.astype("float32")
+            if ((narrow.astype(values.dtype) == values) | values.isna()).all():
+                df[column] = narrow
+    return df
+
+
+def write_arrow(df, arrow_path):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = arrow_path + ".tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, arrow_path)
+
+
+# Parse the workbook once and write it as an uncompressed Arrow IPC file so it can be memory-mapped
+def _build(path, arrow_path):
+    write_arrow(compact(pd.read_excel(path)), arrow_path)
+
+
+# Make sure the columnar copy matches the source; rebuild only when its mtime/size and hash changed
+def _refresh(path):
+    arrow_path, meta_path = _cache_paths(path)
+    stat = os.stat(path)
+    meta = _read_meta(meta_path)
+    if meta is not None and os.path.exists(arrow_path) and meta.get("format") == CACHE_FORMAT:
+        if meta["mtime"] == stat.st_mtime and meta["size"] == stat.st_size:
+            return meta
+        sha256 = _file_sha256(path)
+        if meta["sha256"] == sha256:
+            # Touched but not changed (e.g. a fresh checkout), keep the existing copy
+            meta.update(mtime=stat.st_mtime, size=stat.st_size)
+            _write_meta(meta_path, meta)
+            return meta
+    else:
+        sha256 = _file_sha256(path)
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    _build(path, arrow_path)
+    meta = {"mtime": stat.st_mtime, "size": stat.st_size, "sha256": sha256, "format": CACHE_FORMAT}
+    _write_meta(meta_path, meta)
+    return meta
+
+
+# Return (version, pyarrow.Table) for the dataset, memory-mapped from the Arrow cache
+def load_table(path=DATASET_PATH):
+    with _lock:
+        meta = _refresh(path)
+        cached = _tables.get(path)
+        if cached is not None and cached[0] == meta["sha256"]:
+            return cached
+        arrow_path, _ = _cache_paths(path)
+        source = pa.memory_map(arrow_path, "r")
+        table = pa.ipc.open_file(source).read_all()
+        _tables[path] = (meta["sha256"], table)
+        return _tables[path]
+
+
+# Fingerprint of the source file, used to key anything derived from the dataset
+def dataset_version(path=DATASET_PATH):
+    return load_table(path)[0]
+
+
+# DataFrame over the table: numeric columns without nulls stay zero-copy views of the
+# memory-mapped file (shared with other processes through the page cache), text columns
+# are categoricals and ID columns stay Arrow strings
+def to_frame(table):
+    return table.to_pandas(split_blocks=True, types_mapper={pa.string(): pd.ArrowDtype(pa.string())}.get)
+
+
+# The dataset as one DataFrame per process, shared by every caller and session. Treat it as
+# read-only: copy before changing it (the memory-mapped numeric columns refuse writes anyway)
+def load_dataset(path=DATASET_PATH, columns=None):
+    version, table = load_table(path)
+    with _lock:
+        cached = _frames.get(path)
+        if cached is None or cached[0] != version:
+            cached = _frames[path] = (version, to_frame(table))
+    return cached[1] if columns is None else cached[1][columns]
@@ -0,0 +1,238 @@
+import bisect
+import copy
+import json
+import math
+import os
+import threading
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from dataset import CACHE_DIR, DATASET_PATH, dataset_version, load_dataset
+from history import get_store
+from pipelines import CATEGORICAL_COLUMNS, NUMERIC_COLUMNS
+
+# Whether the customers scored on the Predict page still look like the training data.
+# The reference (quantile bins of every numeric feature, level frequencies of every
+# categorical one) is computed once per dataset version; live counts over the same bins are
+# advanced from a history checkpoint like the live aggregates, so scoring drift never
+# rescans the history.
+
+DRIFT_STATE_PATH = "Data/drift_state.json"
+DRIFT_BINS = 10
+APPLY_BATCH = 5000
+MISSING = "(missing)"
+# Smallest proportion used in PSI, so an empty bin doesn't make it infinite
+PSI_EPSILON = 1e-4
+# Usual PSI reading: below 0.1 stable, up to 0.25 moderate shift, above that significant
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+_references = {}
+_lock = threading.Lock()
+
+
+def _reference_path(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(CACHE_DIR, f"{name}.drift_reference.joblib")
+
+
+# Inner bin edges at the deciles (fewer for features with few distinct values), the share of
+# rows in each bin plus a last entry for missing values; and level shares for categoricals
+def build_reference(data, version=None):
+    numeric = {}
+    for column in NUMERIC_COLUMNS:
+        values = pd.to_numeric(data[column], errors="coerce").to_numpy(dtype=float)
+        present = values[~np.isnan(values)]
+        edges = np.unique(np.quantile(present, np.linspace(0, 1, DRIFT_BINS + 1)[1:-1])).tolist()
+        counts = np.bincount(np.searchsorted(edges, present, side="right"), minlength=len(edges) + 1)
+        counts = np.append(counts, len(values) - len(present))
+        numeric[column] = {"edges": edges, "proportions": (counts / len(values)).tolist()}
+    categorical = {}
+    for column in CATEGORICAL_COLUMNS:
+        frequencies = data[column].astype(object).where(data[column].notna(), MISSING).value_counts(normalize=True)
+        categorical[column] = {str(level): float(share) for level, share in frequencies.items()}
+    return {"version": version, "rows": len(data), "numeric": numeric, "categorical": categorical}
+
+
+def load_reference(path=DATASET_PATH):
+    version = dataset_version(path)
+    with _lock:
+        cached = _references.get(path)
+        if cached is not None and cached["version"] == version:
+            return cached
+        reference_path = _reference_path(path)
+        reference = joblib.load(reference_path) if os.path.exists(reference_path) else None
+        if reference is None or reference["version"] != version:
+            reference = build_reference(load_dataset(path), version)
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            joblib.dump(reference, reference_path + ".tmp")
+            os.replace(reference_path + ".tmp", reference_path)
+        _references[path] = reference
+        return reference
+
+
+def _empty_state(reference):
+    return {
+        "checkpoint": 0,
+        "reference_version": reference["version"],
+        "rows": 0,
+        "numeric": {column: [0] * len(spec["proportions"]) for column, spec in reference["numeric"].items()},
+        "categorical": {column: {} for column in reference["categorical"]},
+    }
+
+
+def _number(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    return value
+
+
+class DriftMonitor:
+    def __init__(self, reference, store=None, path=DRIFT_STATE_PATH):
+        self.reference = reference
+        self.store = store or get_store()
+        self.path = path
+        self.lock = threading.Lock()
+        self.state = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return _empty_state(self.reference)
+        # Counts over another dataset version's bins can't be compared with this reference
+        if state.get("reference_version") != self.reference["version"]:
+            return _empty_state(self.reference)
+        return state
+
+    def _save(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path)
+
+    def _apply(self, rows):
+        state = self.state
+        numeric = self.reference["numeric"]
+        for row_id, *values in rows:
+            for column, value in zip(NUMERIC_COLUMNS, values):
+                value = _number(value)
+                edges = numeric[column]["edges"]
+                index = len(edges) + 1 if math.isnan(value) else bisect.bisect_right(edges, value)
+                state["numeric"][column][index] += 1
+            for column, value in zip(CATEGORICAL_COLUMNS, values[len(NUMERIC_COLUMNS):]):
+                level = MISSING if value is None else str(value)
+                levels = state["categorical"][column]
+                levels[level] = levels.get(level, 0) + 1
+            state["rows"] += 1
+            state["checkpoint"] = row_id
+
+    # Count every history record appended since the checkpoint; returns how many were applied
+    def refresh(self):
+        with self.lock:
+            if self.store.max_id() < self.state["checkpoint"]:
+                # The history database was replaced, start over from its first record
+                self.state = _empty_state(self.reference)
+            applied = 0
+            while True:
+                rows = self.store.after(self.state["checkpoint"], NUMERIC_COLUMNS + CATEGORICAL_COLUMNS, limit=APPLY_BATCH)
+                if not rows:
+                    break
+                self._apply(rows)
+                applied += len(rows)
+            if applied:
+                self._save()
+            return applied
+
+    def snapshot(self):
+        with self.lock:
+            return copy.deepcopy(self.state)
+
+
+def psi(expected, actual):
+    expected = np.clip(np.asarray(expected, dtype=float), PSI_EPSILON, None)
+    actual = np.clip(np.asarray(actual, dtype=float), PSI_EPSILON, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+# Kolmogorov-Smirnov statistic over the reference bins: the largest gap between the two
+# cumulative distributions at a bin edge, missing values left out
+def binned_ks(expected, actual):
+    expected = np.asarray(expected[:-1], dtype=float)
+    actual = np.asarray(actual[:-1], dtype=float)
+    if expected.sum() == 0 or actual.sum() == 0:
+        return float("nan")
+    return float(np.max(np.abs(np.cumsum(expected / expected.sum()) - np.cumsum(actual / actual.sum()))))
+
+
+def status(score):
+    if math.isnan(score):
+        return "no data"
+    if score >= PSI_SIGNIFICANT:
+        return "significant"
+    if score >= PSI_MODERATE:
+        return "moderate"
+    return "stable"
+
+
+# Reference and live shares of every bin or level of one feature; levels the training data
+# never had are kept as their own rows with a reference share of 0
+def distribution(reference, state, column):
+    if column in reference["numeric"]:
+        spec = reference["numeric"][column]
+        edges = spec["edges"]
+        labels = ([f"< {edges[0]:g}"] if edges else []) + [f"{low:g} to {high:g}" for low, high in zip(edges, edges[1:])]
+        labels = (labels + [f">= {edges[-1]:g}"] if edges else ["all"]) + [MISSING]
+        counts = np.asarray(state["numeric"][column], dtype=float)
+        table = pd.DataFrame({"bin": labels, "reference": spec["proportions"]})
+    else:
+        levels = state["categorical"][column]
+        expected = reference["categorical"][column]
+        names = list(expected) + sorted(level for level in levels if level not in expected)
+        counts = np.asarray([levels.get(name, 0) for name in names], dtype=float)
+        table = pd.DataFrame({"bin": names, "reference": [expected.get(name, 0.0) for name in names]})
+    table["live"] = counts / counts.sum() if counts.sum() else 0.0
+    table["live_count"] = counts.astype(int)
+    return table
+
+
+# One row per feature: PSI, binned KS for numeric features, and the live share of levels
+# the training data never had for categorical ones
+def drift_scores(reference, state):
+    rows = []
+    for column in NUMERIC_COLUMNS + CATEGORICAL_COLUMNS:
+        table = distribution(reference, state, column)
+        live = int(table["live_count"].sum())
+        score = psi(table["reference"], table["live"]) if live else float("nan")
+        numeric = column in reference["numeric"]
+        rows.append({
+            "feature": column,
+            "type": "numeric" if numeric else "categorical",
+            "records": live,
+            "psi": score,
+            "ks": binned_ks(table["reference"], table["live"]) if numeric and live else float("nan"),
+            "unseen_share": float(table.loc[table["reference"] == 0, "live"].sum()) if not numeric and live else float("nan"),
+            "status": status(score),
+        })
+    return pd.DataFrame(rows).sort_values("psi", ascending=False, na_position="last").reset_index(drop=True)
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+# Process-wide monitor shared by every session, rebuilt when the dataset changes
+def get_drift_monitor():
+    global _monitor
+    reference = load_reference()
+    with _monitor_lock:
+        if _monitor is None or _monitor.reference["version"] != reference["version"]:
+            _monitor = DriftMonitor(reference)
+        return _monitor
@@ -0,0 +1,242 @@
+import argparse
+import os
+import threading
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_selection import SelectKBest
+from sklearn.preprocessing import OneHotEncoder
+
+from dataset import CACHE_DIR, DATASET_PATH, dataset_version, load_dataset
+from metrics import inc, timed
+from pipelines import MODEL_PATHS, FEATURE_COLUMNS, load_pipeline, prepare_features
+from prediction_cache import cache_key, model_version
+from util import log1p_transform
+
+# Why a customer is at risk: each input field's contribution to the churn log-odds.
+# CatBoost computes exact SHAP values natively, one call per batch. For the logistic model a
+# feature contributes coef * value. One-hot columns are summed back into the field they came
+# from, so a row's contributions plus its base value add up to the model's log-odds.
+
+EXPLANATION_CACHE_SIZE = int(os.environ.get("CHURN_EXPLANATION_CACHE_SIZE", "2000"))
+TOP_DRIVERS = 5
+
+# Grouping matrices keyed by pipeline object, so a reloaded model file gets a fresh one
+_groupings = {}
+_importance = {}
+_lock = threading.Lock()
+
+
+# Sparse (model features x FEATURE_COLUMNS) matrix mapping each column the estimator sees
+# back to the customer field it was derived from
+def _build_grouping(pipeline):
+    preprocessor, selectors = pipeline[0], pipeline.steps[1:-1]
+    width = max(indices.stop for indices in preprocessor.output_indices_.values())
+    owners = np.full(width, -1)
+    for name, transformer, columns in preprocessor.transformers_:
+        if transformer == "drop" or name == "remainder":
+            continue
+        indices = preprocessor.output_indices_[name]
+        steps = [step for _, step in transformer.steps] if hasattr(transformer, "steps") else [transformer]
+        fields = [FEATURE_COLUMNS.index(column) for column in columns]
+        if isinstance(steps[-1], OneHotEncoder):
+            fields = np.repeat(fields, [len(categories) for categories in steps[-1].categories_])
+        owners[indices] = fields
+    for _, selector in selectors:
+        if not isinstance(selector, SelectKBest):
+            raise ValueError(f"Unsupported step {type(selector).__name__}")
+        owners = owners[selector.get_support()]
+    if (owners < 0).any():
+        raise ValueError("Some model features can't be traced back to an input column")
+    return sparse.csr_matrix((np.ones(len(owners)), (np.arange(len(owners)), owners)),
+                             shape=(len(owners), len(FEATURE_COLUMNS)))
+
+
+def grouping_for(pipeline):
+    with _lock:
+        cached = _groupings.get(id(pipeline))
+        if cached is not None and cached[0] is pipeline:
+            return cached[1]
+        grouping = _build_grouping(pipeline)
+        _groupings[id(pipeline)] = (pipeline, grouping)
+        return grouping
+
+
+# Per-model-feature contributions and base values (log-odds) for already preprocessed features
+def _model_contributions(estimator, features):
+    if type(estimator).__name__ == "CatBoostClassifier":
+        from catboost import Pool
+
+        values = estimator.get_feature_importance(data=Pool(features), type="ShapValues", thread_count=-1)
+        return values[:, :-1], values[:, -1]
+    if hasattr(estimator, "coef_") and estimator.coef_.shape[0] == 1:
+        coef = estimator.coef_[0]
+        if sparse.issparse(features):
+            contributions = sparse.csr_matrix(features).multiply(coef).toarray()
+        else:
+            contributions = np.asarray(features) * coef
+        return contributions, np.full(features.shape[0], float(estimator.intercept_[0]))
+    raise ValueError(f"No explainer for {type(estimator).__name__}")
+
+
+# (contributions per FEATURE_COLUMNS field, base value) for every row of a feature matrix
+def explain_features(pipeline, features):
+    contributions, base = _model_contributions(pipeline[-1], features)
+    return np.asarray(contributions @ grouping_for(pipeline)), base
+
+
+# Contributions for every row of df in one vectorized pass: a DataFrame with one column per
+# input field (same index as df) and the base value of each row
+def explain_frame(pipeline, df):
+    features = pipeline[:-1].transform(log1p_transform(prepare_features(df)))
+    contributions, base = explain_features(pipeline, features)
+    return pd.DataFrame(contributions, columns=FEATURE_COLUMNS, index=df.index), base
+
+
+class ExplanationCache:
+    def __init__(self, max_entries=EXPLANATION_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # The key includes the model file version, so a retrained model never reuses old entries
+    def get_or_compute(self, key, compute):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+        if entry is not None:
+            inc("churn_explanation_cache_total", result="hit")
+            return entry
+        inc("churn_explanation_cache_total", result="miss")
+        entry = compute()
+        with self.lock:
+            self.misses += 1
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / lookups if lookups else 0.0, "entries": len(self.entries)}
+
+
+explanation_cache = ExplanationCache()
+
+
+def _explain_row(pipeline, row):
+    from fast_path import compiled_for
+
+    compiled = compiled_for(pipeline)
+    if compiled is None:
+        contributions, base = explain_frame(pipeline, pd.DataFrame([row]))
+        return {"base": float(base[0]), "contributions": contributions.iloc[0].to_dict()}
+    # The compiled fast path builds the exact feature vector without a one-row DataFrame
+    contributions, base = explain_features(pipeline, compiled.features(row))
+    return {"base": float(base[0]), "contributions": dict(zip(FEATURE_COLUMNS, contributions[0].tolist()))}
+
+
+# {"base": log-odds, "contributions": {field: log-odds}} for one customer dict, shared by
+# every session for the same model version and canonical row
+@timed("explain.explain_row")
+def explain_row(name, row):
+    key = cache_key(name, model_version(name), row)
+    return explanation_cache.get_or_compute(key, lambda: _explain_row(load_pipeline(name), row))
+
+
+# The fields that moved this customer's churn risk the most, largest effect first
+def top_drivers(explanation, row, n=TOP_DRIVERS):
+    contributions = pd.Series(explanation["contributions"])
+    top = contributions.reindex(contributions.abs().sort_values(ascending=False).index[:n])
+    return pd.DataFrame({
+        "feature": top.index,
+        "value": [row.get(feature) for feature in top.index],
+        "contribution": top.values,
+        "effect": np.where(top.values > 0, "raises churn risk", "lowers churn risk"),
+    })
+
+
+def _importance_path(name, path):
+    return os.path.join(CACHE_DIR, f"{os.path.basename(path)}.{name}.importance.joblib")
+
+
+def build_importance(pipeline, data):
+    contributions, _ = explain_frame(pipeline, data)
+    return pd.DataFrame({
+        "mean_abs_contribution": contributions.abs().mean(),
+        "mean_contribution": contributions.mean(),
+    }).sort_values("mean_abs_contribution", ascending=False)
+
+
+# Mean absolute contribution of every field over the dataset, computed once per model file
+# and dataset version and kept in memory and under Dataset/.cache
+@timed("explain.global_importance")
+def global_importance(name, path=DATASET_PATH):
+    version = (model_version(name), dataset_version(path))
+    with _lock:
+        cached = _importance.get((name, path))
+        if cached is not None and cached["version"] == version:
+            return cached["importance"]
+    importance_path = _importance_path(name, path)
+    cached = joblib.load(importance_path) if os.path.exists(importance_path) else None
+    if cached is None or cached["version"] != version:
+        cached = {"version": version, "importance": build_importance(load_pipeline(name), load_dataset(path))}
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        joblib.dump(cached, importance_path + ".tmp")
+        os.replace(importance_path + ".tmp", importance_path)
+    with _lock:
+        _importance[(name, path)] = cached
+    return cached["importance"]
+
+
+# Write every row of source with one <field>_contribution column per input field plus the
+# base value, one explainer call per chunk
+def explain_file(source, target, model, chunksize=None, source_name=None, target_name=None):
+    from batch import DEFAULT_CHUNKSIZE, ChunkWriter, read_chunks
+
+    pipeline = load_pipeline(model)
+    writer = ChunkWriter(target, target_name)
+    try:
+        for chunk in read_chunks(source, chunksize or DEFAULT_CHUNKSIZE, source_name):
+            contributions, base = explain_frame(pipeline, chunk)
+            writer.write(chunk.assign(
+                **{f"{column}_contribution": contributions[column] for column in FEATURE_COLUMNS},
+                base_value=base,
+            ))
+    finally:
+        writer.close()
+    return writer.rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-feature churn drivers for a customers file, or the models' global importance.")
+    parser.add_argument("input", nargs="?", help="CSV or Parquet file with the Predict form columns")
+    parser.add_argument("output", nargs="?", help="CSV or Parquet file to write")
+    parser.add_argument("--model", choices=list(MODEL_PATHS), default="Catboost")
+    parser.add_argument("--chunksize", type=int)
+    parser.add_argument("--importance", action="store_true", help="precompute and print global importance for every model")
+    args = parser.parse_args()
+
+    if args.importance:
+        for name in MODEL_PATHS:
+            print(f"{name}:")
+            print(global_importance(name).to_string())
+        return
+    if not (args.input and args.output):
+        parser.error("input and output are required unless --importance is given")
+    rows = explain_file(args.input, args.output, args.model, args.chunksize)
+    print(f"Wrote {rows} explained rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
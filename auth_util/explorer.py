@@ -0,0 +1,155 @@
+import os
+import threading
+from collections import OrderedDict
+
+import joblib
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from dataset import CACHE_DIR, DATASET_PATH, ID_COLUMNS, load_table
+
+# Server-side paging, filtering and sorting over the memory-mapped Arrow table, so the Data
+# page only ever converts and sends the visible rows
+
+# Filtered/sorted row orders kept per process; each is one int64 per matching row
+ORDER_CACHE_ENTRIES = 8
+
+_orders = OrderedDict()
+_summaries = {}
+_lock = threading.Lock()
+
+
+def _summaries_path(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(CACHE_DIR, f"{name}.summaries.joblib")
+
+
+def _is_text(field):
+    return pa.types.is_dictionary(field.type) or pa.types.is_string(field.type)
+
+
+def _plain(column):
+    # Arrow can't sort or compare dictionary columns directly
+    if pa.types.is_dictionary(column.type):
+        return column.cast(column.type.value_type)
+    return column
+
+
+# The same statistics DataFrame.describe() shows for one column, plus the distinct values
+# of low-cardinality text columns for the filter widgets
+def _summarize(field, column):
+    if _is_text(field):
+        counts = pc.value_counts(_plain(column)).to_pylist()
+        non_null = [c for c in counts if c["values"] is not None]
+        top = max(non_null, key=lambda c: c["counts"], default=None)
+        return {
+            "stats": {
+                "count": len(column) - column.null_count,
+                "unique": len(non_null),
+                "top": top["values"] if top else None,
+                "freq": top["counts"] if top else None,
+            },
+            "values": None if field.name in ID_COLUMNS else sorted(c["values"] for c in non_null),
+        }
+    quartiles = pc.quantile(column, q=[0.25, 0.5, 0.75]).to_pylist() if len(column) - column.null_count else [None] * 3
+    min_max = pc.min_max(column).as_py()
+    return {
+        "stats": {
+            "count": len(column) - column.null_count,
+            "mean": pc.mean(column).as_py(),
+            "std": pc.stddev(column, ddof=1).as_py(),
+            "min": min_max["min"],
+            "25%": quartiles[0],
+            "50%": quartiles[1],
+            "75%": quartiles[2],
+            "max": min_max["max"],
+        },
+        "values": None,
+    }
+
+
+def build_summaries(table, version=None):
+    return {
+        "version": version,
+        "columns": {field.name: _summarize(field, table[field.name]) for field in table.schema},
+    }
+
+
+# Per-column summaries for the current dataset version, from memory, then disk, then a fresh build
+def load_summaries(path=DATASET_PATH):
+    version, table = load_table(path)
+    with _lock:
+        cached = _summaries.get(path)
+        if cached is not None and cached["version"] == version:
+            return cached
+        summaries_path = _summaries_path(path)
+        summaries = None
+        if os.path.exists(summaries_path):
+            summaries = joblib.load(summaries_path)
+        if summaries is None or summaries["version"] != version:
+            summaries = build_summaries(table, version)
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            joblib.dump(summaries, summaries_path + ".tmp")
+            os.replace(summaries_path + ".tmp", summaries_path)
+        _summaries[path] = summaries
+        return summaries
+
+
+# filters maps a column to ("in", values), ("range", (low, high)) or ("contains", text)
+def filter_mask(table, filters):
+    mask = None
+    for column, (kind, value) in sorted(filters.items()):
+        data = table[column]
+        if kind == "in":
+            condition = pc.is_in(data, value_set=pa.array(list(value), type=_plain(data).type))
+        elif kind == "range":
+            condition = pc.and_(pc.greater_equal(data, value[0]), pc.less_equal(data, value[1]))
+        elif kind == "contains":
+            condition = pc.match_substring(_plain(data), value, ignore_case=True)
+        else:
+            raise ValueError(f"Unknown filter {kind!r} on {column}")
+        condition = pc.fill_null(condition, False)
+        mask = condition if mask is None else pc.and_(mask, condition)
+    return mask
+
+
+# Row indices matching the filters in sort order, or None for the table's own order
+def _order(version, table, filters, sort_by, ascending):
+    if not filters and sort_by is None:
+        return None
+    key = (version, repr(sorted(filters.items())), sort_by, ascending)
+    with _lock:
+        if key in _orders:
+            _orders.move_to_end(key)
+            return _orders[key]
+
+    indices = None
+    mask = filter_mask(table, filters)
+    if mask is not None:
+        indices = pc.indices_nonzero(mask)
+    if sort_by is not None:
+        column = _plain(table[sort_by])
+        if indices is not None:
+            column = column.take(indices)
+        order = pc.sort_indices(column, sort_keys=[("", "ascending" if ascending else "descending")],
+                                null_placement="at_end")
+        indices = order if indices is None else indices.take(order)
+
+    with _lock:
+        _orders[key] = indices
+        while len(_orders) > ORDER_CACHE_ENTRIES:
+            _orders.popitem(last=False)
+    return indices
+
+
+# One page of rows as a DataFrame and the number of rows matching the filters
+def query_page(filters=None, sort_by=None, ascending=True, offset=0, limit=50, path=DATASET_PATH):
+    version, table = load_table(path)
+    indices = _order(version, table, filters or {}, sort_by, ascending)
+    if indices is None:
+        total = table.num_rows
+        page = table.slice(offset, limit)
+    else:
+        total = len(indices)
+        page = table.take(indices.slice(offset, limit))
+    return page.to_pandas(), total
@@ -0,0 +1,200 @@
+import math
+import threading
+import warnings
+
+import numpy as np
+from scipy import sparse
+from sklearn.compose import ColumnTransformer
+from sklearn.feature_selection import SelectKBest
+from sklearn.impute import SimpleImputer
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder, RobustScaler, StandardScaler
+
+from dataset import load_dataset
+from pipelines import MODEL_PATHS, FEATURE_COLUMNS, NUMERIC_COLUMNS, load_pipeline, predict_proba
+
+# Single-row inference without pandas: the fitted preprocessing of a joblib pipeline is
+# compiled into lookup tables and arithmetic over one fixed-width float64 feature vector,
+# and that vector goes straight to the final estimator.
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _number(value):
+    if value is None:
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class CompiledPipeline:
+    def __init__(self, pipeline):
+        steps = [step for _, step in pipeline.steps]
+        preprocessor, selectors, self.estimator = steps[0], steps[1:-1], steps[-1]
+        if not isinstance(preprocessor, ColumnTransformer):
+            raise ValueError("Expected a ColumnTransformer as the first pipeline step")
+
+        self.width = max(indices.stop for indices in preprocessor.output_indices_.values())
+        self.sparse = preprocessor.sparse_output_
+        self.numeric = []
+        self.categorical = []
+        for name, transformer, columns in preprocessor.transformers_:
+            if transformer == "drop" or name == "remainder":
+                continue
+            offset = preprocessor.output_indices_[name].start
+            self._compile_branch(transformer, list(columns), offset)
+
+        # Feature selection becomes a column mask applied to the compiled vector
+        self.support = None
+        for selector in selectors:
+            if not isinstance(selector, SelectKBest):
+                raise ValueError(f"Unsupported step {type(selector).__name__}")
+            support = selector.get_support()
+            self.support = support if self.support is None else self.support[support]
+        if self.support is not None and self.support.all():
+            self.support = None
+
+    def _compile_branch(self, transformer, columns, offset):
+        steps = [step for _, step in transformer.steps] if hasattr(transformer, "steps") else [transformer]
+        if isinstance(steps[-1], OneHotEncoder):
+            self._compile_categorical(steps, columns, offset)
+        else:
+            self._compile_numeric(steps, columns, offset)
+
+    def _compile_numeric(self, steps, columns, offset):
+        ops = []
+        for step in steps:
+            if isinstance(step, FunctionTransformer) and getattr(step.func, "__name__", "") == "log1p_transform":
+                ops.append(("log1p", columns.index("TotalCharges")))
+            elif isinstance(step, SimpleImputer) and _is_missing(step.missing_values):
+                ops.append(("impute", np.asarray(step.statistics_, dtype=float)))
+            elif isinstance(step, RobustScaler):
+                ops.append(("scale", step.center_ if step.with_centering else None, step.scale_ if step.with_scaling else None))
+            elif isinstance(step, StandardScaler):
+                ops.append(("scale", step.mean_ if step.with_mean else None, step.scale_ if step.with_std else None))
+            else:
+                raise ValueError(f"Unsupported numeric step {type(step).__name__}")
+        self.numeric.append((columns, ops, offset))
+
+    def _compile_categorical(self, steps, columns, offset):
+        *imputers, encoder = steps
+        fill = [None] * len(columns)
+        for step in imputers:
+            if not (isinstance(step, SimpleImputer) and _is_missing(step.missing_values)):
+                raise ValueError(f"Unsupported categorical step {type(step).__name__}")
+            fill = list(step.statistics_)
+        if encoder.drop_idx_ is not None or encoder._infrequent_enabled or encoder.handle_unknown != "ignore":
+            raise ValueError("Only OneHotEncoder(handle_unknown='ignore') without drop/infrequent is supported")
+        # value -> output column, one dict per input column; unknown values map to nothing
+        lookups = []
+        position = offset
+        for categories in encoder.categories_:
+            lookups.append({value: position + i for i, value in enumerate(categories)})
+            position += len(categories)
+        self.categorical.append((columns, fill, lookups))
+
+    # The fixed-width feature vector (before feature selection) for one raw customer dict,
+    # with TotalCharges log1p'd first exactly like pipelines.predict_proba does
+    def vector(self, row):
+        out = np.zeros(self.width)
+        for columns, ops, offset in self.numeric:
+            x = np.array([_number(row.get(column)) for column in columns])
+            if "TotalCharges" in columns:
+                i = columns.index("TotalCharges")
+                x[i] = np.log1p(x[i])
+            for op in ops:
+                if op[0] == "log1p":
+                    x[op[1]] = np.log1p(x[op[1]])
+                elif op[0] == "impute":
+                    missing = np.isnan(x)
+                    x[missing] = op[1][missing]
+                else:
+                    if op[1] is not None:
+                        x -= op[1]
+                    if op[2] is not None:
+                        x /= op[2]
+            out[offset:offset + len(columns)] = x
+        for columns, fill, lookups in self.categorical:
+            for column, default, lookup in zip(columns, fill, lookups):
+                value = row.get(column)
+                if column in NUMERIC_COLUMNS:
+                    value = _number(value)
+                if _is_missing(value):
+                    value = default
+                index = lookup.get(value)
+                if index is not None:
+                    out[index] = 1.0
+        return out
+
+    def features(self, row):
+        x = self.vector(row)
+        if self.support is not None:
+            x = x[self.support]
+        x = x.reshape(1, -1)
+        return sparse.csr_matrix(x) if self.sparse else x
+
+    def predict_proba_row(self, row):
+        return float(self.estimator.predict_proba(self.features(row))[0, 1])
+
+
+# Rows the compiled plan is checked against before it is used
+PROBE_ROWS = 256
+
+# Compiled plans keyed by pipeline object, so a reloaded model file gets a fresh plan
+_compiled = {}
+_lock = threading.Lock()
+
+
+# Largest absolute difference between the compiled and the pandas path over the given rows
+def verify(compiled, pipeline, df):
+    expected = predict_proba(pipeline, df)
+    features = df[FEATURE_COLUMNS]
+    rows = features.astype(object).where(features.notna(), None).to_dict("records")
+    actual = np.array([compiled.predict_proba_row(row) for row in rows])
+    return float(np.max(np.abs(actual - expected)))
+
+
+# Compiled plan for a loaded pipeline, or None when it can't be compiled or doesn't give
+# exactly the pandas path's probabilities on the first PROBE_ROWS rows of the dataset
+def compiled_for(pipeline):
+    with _lock:
+        cached = _compiled.get(id(pipeline))
+        if cached is not None and cached[0] is pipeline:
+            return cached[1]
+        try:
+            compiled = CompiledPipeline(pipeline)
+            if verify(compiled, pipeline, load_dataset().head(PROBE_ROWS)) != 0.0:
+                raise ValueError("compiled probabilities differ from the pipeline")
+        except ValueError as e:
+            warnings.warn(f"Fast path disabled for {type(pipeline[-1]).__name__}: {e}")
+            compiled = None
+        _compiled[id(pipeline)] = (pipeline, compiled)
+        return compiled
+
+
+def get_compiled(name):
+    return compiled_for(load_pipeline(name))
+
+
+# Check the compiled plans against the pandas path on the whole dataset
+def main():
+    import time
+
+    data = load_dataset()
+    for name in MODEL_PATHS:
+        pipeline = load_pipeline(name)
+        compiled = CompiledPipeline(pipeline)
+        difference = verify(compiled, pipeline, data)
+        row = data[FEATURE_COLUMNS].iloc[0].to_dict()
+        start = time.perf_counter()
+        for _ in range(1000):
+            compiled.predict_proba_row(row)
+        elapsed = (time.perf_counter() - start) / 1000
+        print(f"{name}: max difference {difference:g} over {len(data)} rows, {elapsed * 1000:.2f} ms per row")
+
+
+if __name__ == "__main__":
+    main()
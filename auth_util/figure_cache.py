@@ -0,0 +1,87 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import matplotlib.pyplot as plt
+import plotly.io as pio
+
+FIGURE_CACHE_MB = float(os.environ.get("CHURN_FIGURE_CACHE_MB", 64))
+
+
+# LRU of rendered figures (Plotly JSON, matplotlib PNG bytes) capped by total payload size.
+# Keys should include the dataset version so a new dataset never hits old figures.
+class FigureCache:
+    def __init__(self, max_bytes=FIGURE_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def _get(self, key):
+        with self.lock:
+            payload = self.entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def _put(self, key, payload):
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key))
+            self.entries[key] = payload
+            self.size += size
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    # Plotly figure for key, built with build() and stored as JSON on a miss
+    def plotly(self, key, build):
+        payload = self._get(("plotly",) + key)
+        if payload is None:
+            payload = build().to_json()
+            self._put(("plotly",) + key, payload)
+        return pio.from_json(payload)
+
+    # PNG bytes of the matplotlib figure for key, rendered with build() on a miss
+    def png(self, key, build):
+        payload = self._get(("png",) + key)
+        if payload is None:
+            fig = build()
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format="png", bbox_inches="tight")
+            plt.close(fig)
+            payload = buffer.getvalue()
+            self._put(("png",) + key, payload)
+        return payload
+
+    def stats(self):
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "megabytes": self.size / (1024 * 1024),
+            }
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+# Process-wide instance shared by every session
+figure_cache = FigureCache()
@@ -0,0 +1,128 @@
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from pipelines import FEATURE_COLUMNS, NUMERIC_COLUMNS
+
+HISTORY_DB = "Data/history.db"
+
+RECORD_COLUMNS = ["ts", "model", "probability", "prediction"] + FEATURE_COLUMNS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    model TEXT NOT NULL,
+    probability REAL NOT NULL,
+    prediction INTEGER NOT NULL,
+    {features}
+);
+CREATE INDEX IF NOT EXISTS ix_predictions_ts ON predictions (ts);
+CREATE INDEX IF NOT EXISTS ix_predictions_model_ts ON predictions (model, ts);
+CREATE INDEX IF NOT EXISTS ix_predictions_prediction_ts ON predictions (prediction, ts);
+""".format(features=",\n    ".join(
+    f'"{column}" {"REAL" if column in NUMERIC_COLUMNS else "TEXT"}' for column in FEATURE_COLUMNS
+))
+
+
+# Prediction log in a local SQLite database (WAL mode, so readers never block the writers)
+class HistoryStore:
+    def __init__(self, path=HISTORY_DB):
+        self.path = path
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connection() as connection:
+            connection.executescript(_SCHEMA)
+
+    # sqlite3 connections can't be shared between threads, so keep one per thread
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    # Insert many records in one transaction; each record has RECORD_COLUMNS keys (ts defaults to now)
+    def append(self, records):
+        now = time.time()
+        rows = [
+            tuple(record.get("ts", now) if column == "ts" else _plain(record.get(column)) for column in RECORD_COLUMNS)
+            for record in records
+        ]
+        if not rows:
+            return
+        columns = ", ".join(f'"{column}"' for column in RECORD_COLUMNS)
+        placeholders = ", ".join("?" for _ in RECORD_COLUMNS)
+        with self._connection() as connection:
+            connection.executemany(f"INSERT INTO predictions ({columns}) VALUES ({placeholders})", rows)
+
+    def _where(self, start=None, end=None, models=None, prediction=None):
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append(end)
+        if models:
+            clauses.append(f"model IN ({', '.join('?' for _ in models)})")
+            params.extend(models)
+        if prediction is not None:
+            clauses.append("prediction = ?")
+            params.append(int(prediction))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    # One page of records, newest first; start/end are unix timestamps
+    def query(self, start=None, end=None, models=None, prediction=None, limit=50, offset=0):
+        where, params = self._where(start, end, models, prediction)
+        df = pd.read_sql_query(
+            f"SELECT * FROM predictions{where} ORDER BY ts DESC, id DESC LIMIT ? OFFSET ?",
+            self._connection(), params=params + [limit, offset],
+        )
+        df["ts"] = pd.to_datetime(df["ts"], unit="s")
+        return df
+
+    def count(self, start=None, end=None, models=None, prediction=None):
+        where, params = self._where(start, end, models, prediction)
+        return self._connection().execute(f"SELECT COUNT(*) FROM predictions{where}", params).fetchone()[0]
+
+    def models(self):
+        return [row[0] for row in self._connection().execute("SELECT DISTINCT model FROM predictions ORDER BY model")]
+
+    # Records with id > after_id in id order, as (id, *columns) tuples; ids only ever grow
+    def after(self, after_id, columns, limit=5000):
+        selected = ", ".join(f'"{column}"' for column in columns)
+        return self._connection().execute(
+            f"SELECT id, {selected} FROM predictions WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)
+        ).fetchall()
+
+    def max_id(self):
+        return self._connection().execute("SELECT COALESCE(MAX(id), 0) FROM predictions").fetchone()[0]
+
+
+# sqlite3 only takes plain Python scalars
+def _plain(value):
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    if pd.isna(value):
+        return None
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+# Process-wide store shared by every session
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore()
+        return _store
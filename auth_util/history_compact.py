@@ -0,0 +1,378 @@
+import argparse
+import ast
+import csv
+import hashlib
+import json
+import os
+import secrets
+import shutil
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from history import HISTORY_DB, RECORD_COLUMNS, HistoryStore
+from pipelines import FEATURE_COLUMNS, NUMERIC_COLUMNS
+
+# Moves prediction history into an archive of monthly zstd Parquet partitions
+# (Data/history_archive/month=YYYY-MM/*.parquet). It reads the legacy Data/History.csv and
+# the records appended to the SQLite store since the last run, streaming both in bounded
+# chunks. Malformed legacy rows are repaired where possible, identical submissions are
+# written once, and partitions older than the retention window are removed.
+#
+# The legacy CSV never recorded when a row was written, so its rows have no ts and live in
+# their own Data/history_archive/legacy/ partition. Retention leaves that partition alone
+# (delete the directory to drop it), and queries only read it when asked to.
+
+LEGACY_CSV = "Data/History.csv"
+ARCHIVE_DIR = "Data/history_archive"
+STATE_FILE = "_state.json"
+CHUNK_ROWS = 50_000
+# Keep this many days of archived history; 0 keeps everything
+RETENTION_DAYS = int(os.environ.get("CHURN_HISTORY_RETENTION_DAYS", "0"))
+# The same customer scored by the same model within this many seconds is a repeated submit
+DEDUP_SECONDS = 5
+# Partitions with more files than this are merged into one file
+COMPACT_FILES = 8
+LEGACY_PARTITION = "legacy"
+
+SCHEMA = pa.schema(
+    [("id", pa.int64()), ("ts", pa.float64()), ("model", pa.string()), ("probability", pa.float64()),
+     ("prediction", pa.int8())]
+    + [(column, pa.float64() if column in NUMERIC_COLUMNS else pa.string()) for column in FEATURE_COLUMNS]
+    + [("source", pa.string())]
+)
+
+
+def month_of(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m")
+
+
+def _partition_dir(archive_dir, month):
+    return os.path.join(archive_dir, f"month={month}")
+
+
+def _legacy_dir(archive_dir):
+    return os.path.join(archive_dir, LEGACY_PARTITION)
+
+
+def _parquet_files(directory, prefix=""):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name for name in os.listdir(directory) if name.startswith(prefix) and name.endswith(".parquet"))
+
+
+# Partitions covering [start, end) unix timestamps, oldest first; None means unbounded
+def partitions(archive_dir=ARCHIVE_DIR, start=None, end=None):
+    if not os.path.isdir(archive_dir):
+        return []
+    months = sorted(name[len("month="):] for name in os.listdir(archive_dir) if name.startswith("month="))
+    first = month_of(start) if start is not None else None
+    last = month_of(end - 1) if end is not None else None
+    return [month for month in months if (first is None or month >= first) and (last is None or month <= last)]
+
+
+def _read_state(archive_dir):
+    try:
+        with open(os.path.join(archive_dir, STATE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"store_checkpoint": 0, "legacy": None, "recent_keys": []}
+
+
+def _write_state(archive_dir, state):
+    path = os.path.join(archive_dir, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _text(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+# Fields of one legacy line, or None if it can't be parsed. Some rows were written as the
+# repr of a Python tuple ('Male', 'Yes', ..., 'mailed check')" instead of CSV.
+def _legacy_fields(line):
+    text = line.strip()
+    if "'" in text and "," in text:
+        text = text.strip('"').strip().lstrip("(").rstrip(")")
+        try:
+            return list(ast.literal_eval(f"({text},)")), True
+        except (ValueError, SyntaxError):
+            return None, True
+    return next(csv.reader([text])), False
+
+
+# Records of the legacy CSV, chunk by chunk. It has no header of its own, but header lines
+# appear in the middle where the writer's column order was reset, so each one sets the order
+# of the lines that follow. The file has no timestamps, so rows get none.
+def read_legacy(path, stats, chunk_rows=CHUNK_ROWS):
+    order = FEATURE_COLUMNS
+    chunk = []
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if not line.strip():
+                stats["blank"] += 1
+                continue
+            fields, repaired = _legacy_fields(line)
+            if fields is not None and sorted(field.strip() for field in fields if isinstance(field, str)) == sorted(FEATURE_COLUMNS):
+                order = [field.strip() for field in fields]
+                stats["headers"] += 1
+                continue
+            if fields is None or len(fields) != len(order):
+                stats["rejected"] += 1
+                continue
+            stats["repaired"] += repaired
+            record = {"id": None, "ts": None, "model": None, "probability": None, "prediction": None, "source": "legacy_csv"}
+            for column, value in zip(order, fields):
+                record[column] = _number(value) if column in NUMERIC_COLUMNS else _text(value)
+            chunk.append(record)
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+# Records appended to the SQLite store after the checkpoint id, chunk by chunk
+def read_store(store, checkpoint, chunk_rows=CHUNK_ROWS):
+    while True:
+        rows = store.after(checkpoint, RECORD_COLUMNS, limit=chunk_rows)
+        if not rows:
+            return
+        chunk = [{"id": row[0], **dict(zip(RECORD_COLUMNS, row[1:])), "source": "store"} for row in rows]
+        checkpoint = rows[-1][0]
+        yield chunk, checkpoint
+
+
+def _dedup_key(record):
+    bucket = int(record["ts"] // DEDUP_SECONDS) if record["source"] == "store" else None
+    payload = json.dumps([record["model"], bucket] + [record[column] for column in FEATURE_COLUMNS])
+    return hashlib.blake2b(payload.encode(), digest_size=16).digest()
+
+
+# One Parquet file per partition touched by a run, appended chunk by chunk. Records go to
+# their monthly partition, or all to the legacy one.
+class PartitionWriter:
+    def __init__(self, archive_dir, prefix, legacy=False):
+        self.archive_dir = archive_dir
+        self.legacy = legacy
+        # Unique even for two runs of one process within a second, which would overwrite each other
+        self.name = f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{secrets.token_hex(4)}.parquet"
+        self.writers = {}
+        self.rows = 0
+
+    def write(self, records):
+        by_directory = {}
+        for record in records:
+            directory = _legacy_dir(self.archive_dir) if self.legacy else _partition_dir(self.archive_dir, month_of(record["ts"]))
+            by_directory.setdefault(directory, []).append(record)
+        for directory, rows in by_directory.items():
+            writer = self.writers.get(directory)
+            if writer is None:
+                os.makedirs(directory, exist_ok=True)
+                writer = self.writers[directory] = pq.ParquetWriter(
+                    os.path.join(directory, self.name + ".tmp"), SCHEMA, compression="zstd")
+            writer.write_table(pa.Table.from_pylist(rows, schema=SCHEMA))
+            self.rows += len(rows)
+
+    # Files only get their final name once complete, readers never see half-written ones;
+    # without commit they are deleted so a failed run can simply be repeated
+    def close(self, commit=True):
+        for directory, writer in self.writers.items():
+            writer.close()
+            path = os.path.join(directory, self.name)
+            if commit:
+                os.replace(path + ".tmp", path)
+            else:
+                os.remove(path + ".tmp")
+        return sorted(self.writers)
+
+
+# Write the records whose dedup key hasn't been seen; recent collects {key: ts} of store records
+def _export(chunk, writer, seen, stats, recent=None):
+    stats["read"] += len(chunk)
+    unique = []
+    for record in chunk:
+        key = _dedup_key(record)
+        if key in seen:
+            stats["duplicates"] += 1
+            continue
+        seen.add(key)
+        unique.append(record)
+        if recent is not None:
+            recent[key.hex()] = record["ts"]
+    writer.write(unique)
+    stats["written"] += len(unique)
+
+
+def _store_files(directory):
+    return _parquet_files(directory, "store-")
+
+
+# Merge the store export files of a partition into one, streaming record batches. Legacy files
+# stay separate so a changed History.csv can replace them.
+def compact_partition(archive_dir, month):
+    directory = _partition_dir(archive_dir, month)
+    files = _store_files(directory)
+    if len(files) <= 1:
+        return 0
+    name = f"store-compacted-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{secrets.token_hex(4)}.parquet"
+    target = os.path.join(directory, name)
+    with pq.ParquetWriter(target + ".tmp", SCHEMA, compression="zstd") as writer:
+        for file in files:
+            for batch in pq.ParquetFile(os.path.join(directory, file)).iter_batches(batch_size=CHUNK_ROWS):
+                writer.write_batch(batch)
+    os.replace(target + ".tmp", target)
+    for file in files:
+        os.remove(os.path.join(directory, file))
+    return len(files)
+
+
+# Drop whole monthly partitions that end before the retention window starts. The undated
+# legacy partition is never removed here.
+def apply_retention(archive_dir, days, now=None):
+    if not days:
+        return []
+    cutoff = month_of((now or time.time()) - timedelta(days=days).total_seconds())
+    removed = [month for month in partitions(archive_dir) if month < cutoff]
+    for month in removed:
+        shutil.rmtree(_partition_dir(archive_dir, month))
+    return removed
+
+
+def run(archive_dir=ARCHIVE_DIR, legacy_csv=LEGACY_CSV, history_db=HISTORY_DB, retention_days=RETENTION_DAYS,
+        compact_files=COMPACT_FILES, chunk_rows=CHUNK_ROWS):
+    os.makedirs(archive_dir, exist_ok=True)
+    state = _read_state(archive_dir)
+    stats = {"read": 0, "written": 0, "duplicates": 0, "repaired": 0, "rejected": 0, "blank": 0, "headers": 0}
+    # Keys of the last store records exported by the previous run, so a repeated submit split
+    # across two runs is still written once
+    recent = dict(state.get("recent_keys") or {})
+    seen = {bytes.fromhex(key) for key in recent}
+
+    # The legacy file is exported again only when it changed, replacing its earlier export.
+    # Archives from before the legacy partition existed kept its rows in monthly partitions.
+    if os.path.exists(legacy_csv):
+        stat = os.stat(legacy_csv)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        old_files = [os.path.join(_legacy_dir(archive_dir), name) for name in _parquet_files(_legacy_dir(archive_dir))]
+        old_files += [os.path.join(_partition_dir(archive_dir, month), name) for month in partitions(archive_dir)
+                      for name in _parquet_files(_partition_dir(archive_dir, month), "legacy-")]
+        misplaced = any(not path.startswith(_legacy_dir(archive_dir)) for path in old_files)
+        if state["legacy"] != signature or misplaced:
+            writer = PartitionWriter(archive_dir, "legacy", legacy=True)
+            try:
+                for chunk in read_legacy(legacy_csv, stats, chunk_rows):
+                    _export(chunk, writer, seen, stats)
+            except BaseException:
+                writer.close(commit=False)
+                raise
+            for path in old_files:
+                os.remove(path)
+                directory = os.path.dirname(path)
+                if directory != _legacy_dir(archive_dir) and not os.listdir(directory):
+                    os.rmdir(directory)
+            writer.close()
+            state["legacy"] = signature
+            _write_state(archive_dir, state)
+
+    # Store records are exported once: the checkpoint only moves after their files are complete
+    if os.path.exists(history_db):
+        store = HistoryStore(history_db)
+        writer = PartitionWriter(archive_dir, "store")
+        checkpoint = state["store_checkpoint"]
+        if store.max_id() < checkpoint:
+            # The history database was replaced, its records start again from id 1
+            checkpoint = 0
+        try:
+            for chunk, checkpoint in read_store(store, checkpoint, chunk_rows):
+                _export(chunk, writer, seen, stats, recent)
+        except BaseException:
+            writer.close(commit=False)
+            raise
+        writer.close()
+        state["store_checkpoint"] = checkpoint
+        # A later duplicate can only match a record of the newest dedup bucket
+        newest = max(recent.values(), default=0)
+        state["recent_keys"] = {key: ts for key, ts in recent.items() if ts >= newest - DEDUP_SECONDS}
+        _write_state(archive_dir, state)
+
+    stats["removed_partitions"] = apply_retention(archive_dir, retention_days)
+    stats["compacted_files"] = 0
+    for month in partitions(archive_dir):
+        directory = _partition_dir(archive_dir, month)
+        if len(_store_files(directory)) > compact_files:
+            stats["compacted_files"] += compact_partition(archive_dir, month)
+    stats["partitions"] = partitions(archive_dir)
+    return stats
+
+
+# Archived records in [start, end) matching models/prediction, newest first, reading only the
+# partitions the range touches. With include_legacy the undated legacy rows are added whatever
+# the range (they have no model or prediction, so those filters still exclude them).
+# Returns (one page of records, number of matching records).
+def query_archive(start=None, end=None, models=None, prediction=None, limit=50, offset=0, archive_dir=ARCHIVE_DIR,
+                  include_legacy=False):
+    months = partitions(archive_dir, start, end)
+    files = [os.path.join(_partition_dir(archive_dir, month), name)
+             for month in months for name in _parquet_files(_partition_dir(archive_dir, month))]
+    if include_legacy:
+        files += [os.path.join(_legacy_dir(archive_dir), name) for name in _parquet_files(_legacy_dir(archive_dir))]
+    if not files:
+        return SCHEMA.empty_table().to_pandas(), 0
+    in_range = None
+    for clause in [
+        ds.field("ts") >= start if start is not None else None,
+        ds.field("ts") < end if end is not None else None,
+    ]:
+        if clause is not None:
+            in_range = clause if in_range is None else in_range & clause
+    if in_range is not None and include_legacy:
+        in_range = in_range | ds.field("ts").is_null()
+    condition = in_range
+    for clause in [
+        ds.field("model").isin(models) if models else None,
+        ds.field("prediction") == int(prediction) if prediction is not None else None,
+    ]:
+        if clause is not None:
+            condition = clause if condition is None else condition & clause
+    table = ds.dataset(files, schema=SCHEMA, format="parquet").to_table(filter=condition)
+    total = table.num_rows
+    if total:
+        table = table.sort_by([("ts", "descending"), ("id", "descending")]).slice(offset, limit)
+    df = table.to_pandas()
+    df["ts"] = pd.to_datetime(df["ts"], unit="s")
+    return df, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive prediction history into compressed monthly Parquet partitions.")
+    parser.add_argument("--archive", default=ARCHIVE_DIR)
+    parser.add_argument("--legacy-csv", default=LEGACY_CSV)
+    parser.add_argument("--history-db", default=HISTORY_DB)
+    parser.add_argument("--retention-days", type=int, default=RETENTION_DAYS,
+                        help="0 keeps every partition; the undated legacy partition is always kept")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    stats = run(args.archive, args.legacy_csv, args.history_db, args.retention_days, chunk_rows=args.chunk_rows)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+import warnings
+
+from history import _plain, get_store
+from metrics import inc, observe, set_gauge
+
+# Write-behind for the prediction history: make_prediction only enqueues, and a background
+# thread appends the records in batches. A full queue blocks the caller instead of dropping
+# records, and the queue is drained at interpreter exit. A batch the store still refuses at
+# shutdown is written to a spill file and appended the next time a writer starts.
+
+HISTORY_QUEUE_SIZE = int(os.environ.get("CHURN_HISTORY_QUEUE_SIZE", "10000"))
+HISTORY_BATCH_SIZE = 500
+# Longest a record waits for company before its batch is written
+HISTORY_FLUSH_SECONDS = 0.5
+RETRY_SECONDS = 1.0
+SHUTDOWN_ATTEMPTS = 3
+HISTORY_SPILL_PATH = os.environ.get("CHURN_HISTORY_SPILL_PATH", "Data/history_spill.jsonl")
+
+
+class HistoryWriter:
+    def __init__(self, store=None, max_queue=HISTORY_QUEUE_SIZE, batch_size=HISTORY_BATCH_SIZE,
+                 flush_seconds=HISTORY_FLUSH_SECONDS, spill_path=HISTORY_SPILL_PATH):
+        self.store = store
+        self.spill_path = spill_path
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.stats_lock = threading.Lock()
+        self.counts = {"submitted": 0, "written": 0, "batches": 0, "blocked": 0, "errors": 0, "max_depth": 0,
+                       "spilled": 0, "replayed": 0}
+        self.stopping = threading.Event()
+        self.thread = None
+        self.thread_lock = threading.Lock()
+
+    def _start(self):
+        with self.thread_lock:
+            if self.thread is None:
+                self.stopping.clear()
+                self.thread = threading.Thread(target=self._run, name="churn-history-writer", daemon=True)
+                self.thread.start()
+
+    def _count(self, **deltas):
+        with self.stats_lock:
+            for key, value in deltas.items():
+                self.counts[key] += value
+            depth = self.queue.qsize()
+            self.counts["max_depth"] = max(self.counts["max_depth"], depth)
+        set_gauge("churn_history_queue_depth", depth)
+
+    # Queue records for writing; blocks only while the queue is full. Records are stamped
+    # now, so a late or replayed write keeps the time of the prediction.
+    def submit(self, records):
+        self._start()
+        now = time.time()
+        for record in records:
+            record = {"ts": now, **record}
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                start = time.perf_counter()
+                self.queue.put(record)
+                observe("churn_history_enqueue_wait_seconds", time.perf_counter() - start)
+                self._count(blocked=1)
+        self._count(submitted=len(records))
+        inc("churn_history_records_total", len(records), state="submitted")
+
+    def _next_batch(self):
+        try:
+            batch = [self.queue.get(timeout=self.flush_seconds)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        store = self.store or get_store()
+        # A failed append is retried rather than dropped, until shutdown runs out of attempts
+        attempts = 0
+        while True:
+            try:
+                store.append(batch)
+                written = True
+                break
+            except Exception as e:
+                attempts += 1
+                self._count(errors=1)
+                inc("churn_history_write_errors_total")
+                if self.stopping.is_set() and attempts >= SHUTDOWN_ATTEMPTS:
+                    warnings.warn(f"History append of {len(batch)} records failed at shutdown, "
+                                  f"spilling them to {self.spill_path}: {e}")
+                    self._spill(batch)
+                    written = False
+                    break
+                warnings.warn(f"History append of {len(batch)} records failed, retrying: {e}")
+                time.sleep(RETRY_SECONDS)
+        for _ in batch:
+            self.queue.task_done()
+        if written:
+            self._count(written=len(batch), batches=1)
+            inc("churn_history_records_total", len(batch), state="written")
+            inc("churn_history_batches_total")
+
+    # One JSON record per line, appended and synced so the file survives the exit
+    def _spill(self, batch):
+        if os.path.dirname(self.spill_path):
+            os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+        with open(self.spill_path, "a") as f:
+            for record in batch:
+                f.write(json.dumps({key: _plain(value) for key, value in record.items()}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._count(spilled=len(batch))
+        inc("churn_history_records_total", len(batch), state="spilled")
+
+    # Append the records spilled by an earlier shutdown. The file is claimed with a rename, so
+    # two processes starting at once never replay it twice; if the store still fails, the
+    # records go back to the spill file for the next start.
+    def replay_spill(self):
+        claimed = f"{self.spill_path}.{os.getpid()}.replay"
+        try:
+            os.replace(self.spill_path, claimed)
+        except FileNotFoundError:
+            return 0
+        with open(claimed) as f:
+            lines = f.readlines()
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # A line cut short by a crash mid-write; the rest of the file is still good
+                warnings.warn(f"Skipping an unreadable line of {self.spill_path}")
+        appended = 0
+        try:
+            while appended < len(records):
+                batch = records[appended:appended + self.batch_size]
+                (self.store or get_store()).append(batch)
+                appended += len(batch)
+        except Exception as e:
+            warnings.warn(f"Replaying {len(records) - appended} spilled history records failed, keeping them: {e}")
+            with open(self.spill_path, "a") as f:
+                f.writelines(json.dumps(record) + "\n" for record in records[appended:])
+        os.remove(claimed)
+        self._count(replayed=appended)
+        if appended:
+            inc("churn_history_records_total", appended, state="replayed")
+        return appended
+
+    def _run(self):
+        self.replay_spill()
+        while not (self.stopping.is_set() and self.queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+
+    # Wait until every record queued so far has been written
+    def flush(self):
+        if self.thread is not None:
+            self.queue.join()
+
+    # Stop the writer thread once it has drained the queue
+    def close(self):
+        self.stopping.set()
+        with self.thread_lock:
+            thread, self.thread = self.thread, None
+        if thread is not None:
+            thread.join()
+
+    def stats(self):
+        with self.stats_lock:
+            return {**self.counts, "depth": self.queue.qsize()}
+
+
+history_writer = HistoryWriter()
+atexit.register(history_writer.close)
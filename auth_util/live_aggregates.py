@@ -0,0 +1,128 @@
+import copy
+import json
+import os
+import threading
+
+import pandas as pd
+
+from aggregates import counts
+from history import get_store
+
+# Running totals over the prediction history, advanced from a checkpoint (the last history id
+# applied) so each refresh only reads the records appended since, and saved between restarts
+
+LIVE_STATE_PATH = "Data/live_aggregates.json"
+LIVE_DIMENSIONS = ["Contract", "PaymentMethod", "InternetService"]
+APPLY_BATCH = 5000
+
+
+def _empty_cell():
+    return {"rows": 0, "predicted_churn": 0, "probability_sum": 0.0}
+
+
+def _empty_state():
+    return {
+        "checkpoint": 0,
+        "totals": _empty_cell(),
+        "models": {},
+        "dimensions": {dimension: {} for dimension in LIVE_DIMENSIONS},
+    }
+
+
+def _add(cell, probability, prediction):
+    cell["rows"] += 1
+    cell["predicted_churn"] += int(prediction)
+    cell["probability_sum"] += float(probability)
+
+
+class LiveAggregates:
+    def __init__(self, store=None, path=LIVE_STATE_PATH):
+        self.store = store or get_store()
+        self.path = path
+        self.lock = threading.Lock()
+        self.state = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return _empty_state()
+        if sorted(state.get("dimensions", {})) != sorted(LIVE_DIMENSIONS):
+            return _empty_state()
+        return state
+
+    def _save(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path)
+
+    def _apply(self, rows):
+        state = self.state
+        for row_id, model, probability, prediction, *values in rows:
+            _add(state["totals"], probability, prediction)
+            _add(state["models"].setdefault(model, _empty_cell()), probability, prediction)
+            for dimension, value in zip(LIVE_DIMENSIONS, values):
+                _add(state["dimensions"][dimension].setdefault(str(value), _empty_cell()), probability, prediction)
+            state["checkpoint"] = row_id
+
+    # Apply every history record appended since the checkpoint; returns how many were applied
+    def refresh(self):
+        with self.lock:
+            if self.store.max_id() < self.state["checkpoint"]:
+                # The history database was replaced, start over from its first record
+                self.state = _empty_state()
+            applied = 0
+            while True:
+                rows = self.store.after(self.state["checkpoint"], ["model", "probability", "prediction"] + LIVE_DIMENSIONS,
+                                        limit=APPLY_BATCH)
+                if not rows:
+                    break
+                self._apply(rows)
+                applied += len(rows)
+            if applied:
+                self._save()
+            return applied
+
+    def snapshot(self):
+        with self.lock:
+            return copy.deepcopy(self.state)
+
+
+# Training churn next to live predictions for one dimension, one row per value
+def live_table(training_aggregates, state, dimension):
+    training = counts(training_aggregates, [dimension, "Churn"])
+    training[dimension] = training[dimension].astype(str)
+    customers = training.groupby(dimension)["count"].sum()
+    churned = training[training["Churn"] == "Yes"].groupby(dimension)["count"].sum()
+    table = pd.DataFrame({
+        "training_customers": customers,
+        "training_churn_rate": (churned.reindex(customers.index, fill_value=0) / customers),
+    })
+    live = pd.DataFrame.from_dict(state["dimensions"][dimension], orient="index", columns=list(_empty_cell()))
+    if not live.empty:
+        table = table.join(pd.DataFrame({
+            "predictions": live["rows"],
+            "predicted_churn_rate": live["predicted_churn"] / live["rows"],
+            "mean_probability": live["probability_sum"] / live["rows"],
+        }), how="outer")
+    else:
+        table = table.assign(predictions=0, predicted_churn_rate=float("nan"), mean_probability=float("nan"))
+    table.index.name = dimension
+    return table.reset_index()
+
+
+_live = None
+_live_lock = threading.Lock()
+
+
+# Process-wide live aggregates shared by every session
+def get_live_aggregates():
+    global _live
+    with _live_lock:
+        if _live is None:
+            _live = LiveAggregates()
+        return _live
@@ -0,0 +1,203 @@
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Process-wide counters and latency histograms, exported in the Prometheus text format
+# over HTTP when CHURN_METRICS_PORT is set and/or to a file when CHURN_METRICS_FILE is set
+
+METRICS_PORT = os.environ.get("CHURN_METRICS_PORT")
+METRICS_FILE = os.environ.get("CHURN_METRICS_FILE")
+METRICS_FILE_INTERVAL = 15
+
+# Upper bounds of the latency histogram buckets in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "churn_duration_seconds": ("histogram", "Time spent in instrumented app functions"),
+    "churn_errors_total": ("counter", "Exceptions raised by instrumented app functions"),
+    "churn_predictions_total": ("counter", "Predictions made on the Predict page"),
+    "churn_prediction_cache_total": ("counter", "Prediction cache lookups by result"),
+    "churn_explanation_cache_total": ("counter", "Explanation cache lookups by result"),
+    "churn_history_records_total": ("counter", "History records submitted, written, spilled at shutdown and replayed"),
+    "churn_history_batches_total": ("counter", "Batched appends to the history store"),
+    "churn_history_write_errors_total": ("counter", "Failed history appends (retried)"),
+    "churn_history_queue_depth": ("gauge", "History records waiting to be written"),
+    "churn_history_enqueue_wait_seconds": ("histogram", "Time make_prediction waited on a full history queue"),
+}
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in items)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(items, escaped)) + "}"
+
+
+class Registry:
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.gauges[(name, _labels(labels))] = value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _labels(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    # Everything recorded so far in the Prometheus text exposition format
+    def render(self):
+        with self.lock:
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+            histograms = sorted((key, {**h, "buckets": list(h["buckets"])}) for key, h in self.histograms.items())
+        lines = []
+        described = set()
+
+        def describe(name):
+            if name not in described and name in HELP:
+                kind, text = HELP[name]
+                lines.extend([f"# HELP {name} {text}", f"# TYPE {name} {kind}"])
+            described.add(name)
+
+        for (name, labels), value in counters + gauges:
+            describe(name)
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), histogram in histograms:
+            describe(name)
+            for bound, count in zip(BUCKETS, histogram["buckets"]):
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def inc(name, value=1, **labels):
+    registry.inc(name, value, **labels)
+
+
+def set_gauge(name, value, **labels):
+    registry.set(name, value, **labels)
+
+
+def observe(name, seconds, **labels):
+    registry.observe(name, seconds, **labels)
+
+
+# Time a block or, used as a decorator, every call of a function:
+#   with timed("dashboard.load_aggregates"): ...
+#   @timed("predict.make_prediction")
+@contextmanager
+def timed(function):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        registry.inc("churn_errors_total", function=function)
+        raise
+    finally:
+        registry.observe("churn_duration_seconds", time.perf_counter() - start, function=function)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_metrics_file(path):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(registry.render())
+    os.replace(tmp, path)
+
+
+def _write_periodically(path):
+    while True:
+        time.sleep(METRICS_FILE_INTERVAL)
+        try:
+            write_metrics_file(path)
+        except OSError as e:
+            warnings.warn(f"Could not write metrics to {path}: {e}")
+
+
+_exporter_started = False
+_exporter_lock = threading.Lock()
+
+
+# Start the configured exporters once per process; later calls are no-ops
+def start_exporter(port=METRICS_PORT, path=METRICS_FILE):
+    global _exporter_started
+    with _exporter_lock:
+        if _exporter_started:
+            return
+        _exporter_started = True
+    if port:
+        try:
+            server = ThreadingHTTPServer(("127.0.0.1", int(port)), _Handler)
+        except OSError as e:  # e.g. a second app process on the same port
+            warnings.warn(f"Metrics endpoint not started on port {port}: {e}")
+        else:
+            threading.Thread(target=server.serve_forever, name="churn-metrics", daemon=True).start()
+    if path:
+        threading.Thread(target=_write_periodically, args=(path,), name="churn-metrics-file", daemon=True).start()
+
+
+# cProfile the block when enabled; yields the profiler, or None when disabled
+@contextmanager
+def profiled(enabled=True):
+    profiler = cProfile.Profile() if enabled else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield profiler
+    finally:
+        if profiler is not None:
+            profiler.disable()
+
+
+def profile_report(profiler, limit=30):
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
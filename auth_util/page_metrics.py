@@ -0,0 +1,18 @@
+from contextlib import contextmanager
+
+import streamlit as st
+
+from auth import is_admin
+from metrics import profile_report, profiled, start_exporter, timed
+
+
+# Time one run of a page script; admins can also profile the run from the sidebar
+@contextmanager
+def instrumented_page(name):
+    start_exporter()
+    enabled = is_admin() and st.sidebar.checkbox("Profile this run", key=f"profile_{name}")
+    with timed(f"page.{name}"), profiled(enabled) as profiler:
+        yield
+    if profiler is not None:
+        with st.sidebar.expander("Profile (cumulative time)"):
+            st.text(profile_report(profiler))
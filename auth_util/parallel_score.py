@@ -0,0 +1,75 @@
+import argparse
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from batch import DEFAULT_CHUNKSIZE, ChunkWriter, read_chunks
+from pipelines import MODEL_PATHS, load_pipeline, predict_proba, label_from_proba
+
+# Pipelines loaded once per worker process by _init_worker
+_worker_pipelines = {}
+
+
+def _init_worker(models, cwd):
+    os.chdir(cwd)
+    for model in models:
+        _worker_pipelines[model] = load_pipeline(model)
+
+
+def _score_chunk(chunk):
+    scored = chunk.copy()
+    for model, pipeline in _worker_pipelines.items():
+        probability = predict_proba(pipeline, chunk)
+        scored[f"{model}_probability"] = probability
+        scored[f"{model}_prediction"] = label_from_proba(probability)
+    return scored
+
+
+# Score source with a pool of worker processes, one chunk per task. Results are written in
+# input order as they complete, and at most 2 * workers chunks are in flight at a time so
+# memory stays bounded whatever the file size. Returns {"rows", "seconds", "rows_per_second"}.
+def score_file_parallel(source, target, models=tuple(MODEL_PATHS), chunksize=DEFAULT_CHUNKSIZE,
+                        workers=None, source_name=None, target_name=None):
+    workers = workers or os.cpu_count()
+    writer = ChunkWriter(target, target_name)
+    pending = deque()
+    start = time.perf_counter()
+    # spawn rather than fork: the parent may be a threaded server (Streamlit, uvicorn)
+    context = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(tuple(models), os.getcwd())) as pool:
+            for chunk in read_chunks(source, chunksize, source_name):
+                pending.append(pool.submit(_score_chunk, chunk))
+                if len(pending) >= 2 * workers:
+                    writer.write(pending.popleft().result())
+            while pending:
+                writer.write(pending.popleft().result())
+    finally:
+        writer.close()
+    seconds = time.perf_counter() - start
+    return {"rows": writer.rows, "seconds": seconds, "rows_per_second": writer.rows / seconds if seconds else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a large CSV/Parquet file on every CPU core.")
+    parser.add_argument("input", help="CSV or Parquet file with the Predict form columns")
+    parser.add_argument("output", help="CSV or Parquet file to write the scored rows to")
+    parser.add_argument("--model", choices=list(MODEL_PATHS), action="append",
+                        help="model to score with (repeatable, default: all)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    stats = score_file_parallel(args.input, args.output, models=args.model or tuple(MODEL_PATHS),
+                                chunksize=args.chunksize, workers=args.workers)
+    print(f"{stats['rows']} rows in {stats['seconds']:.2f}s with {args.workers} workers "
+          f"({stats['rows_per_second']:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import os
+import sys
+import threading
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from util import log1p_transform
+
+MODEL_PATHS = {
+    "Catboost": "models/catboost_pipeline.joblib",
+    "Logistic": "models/logistic_pipeline.joblib",
+}
+
+# Input columns of the fitted pipelines, in the order the Predict form builds them
+NUMERIC_COLUMNS = ["SeniorCitizen", "MonthlyCharges", "TotalCharges", "tenure"]
+CATEGORICAL_COLUMNS = [
+    "gender", "Partner", "Dependents", "PhoneService", "MultipleLines",
+    "InternetService", "OnlineSecurity", "OnlineBackup", "DeviceProtection",
+    "TechSupport", "StreamingTV", "StreamingMovies", "Contract",
+    "PaperlessBilling", "PaymentMethod"
+]
+FEATURE_COLUMNS = [
+    "gender", "Partner", "Dependents", "SeniorCitizen", "MonthlyCharges",
+    "TotalCharges", "tenure", "PhoneService", "MultipleLines", "InternetService",
+    "OnlineSecurity", "OnlineBackup", "DeviceProtection", "TechSupport",
+    "StreamingTV", "StreamingMovies", "Contract", "PaperlessBilling", "PaymentMethod"
+]
+
+# A typical customer, used to warm the pipelines up
+EXAMPLE_CUSTOMER = {
+    "gender": "Female", "Partner": "Yes", "Dependents": "No", "SeniorCitizen": 0,
+    "MonthlyCharges": 29.85, "TotalCharges": 29.85, "tenure": 1, "PhoneService": "No",
+    "MultipleLines": None, "InternetService": "DSL", "OnlineSecurity": "No",
+    "OnlineBackup": "Yes", "DeviceProtection": "No", "TechSupport": "No",
+    "StreamingTV": "No", "StreamingMovies": "No", "Contract": "Month-to-month",
+    "PaperlessBilling": "Yes", "PaymentMethod": "Electronic check"
+}
+
+# Loaded pipelines keyed by model name, shared by every session in this process
+_pipelines = {}
+_lock = threading.Lock()
+
+
+# Set CHURN_MODEL_FORMAT=optimized to load the exported copies under models/optimized
+MODEL_FORMAT = os.environ.get("CHURN_MODEL_FORMAT", "joblib")
+
+
+def load_joblib_pipeline(path):
+    # The pipelines were pickled from a script, so their FunctionTransformer looks
+    # up log1p_transform on __main__; outside Streamlit pages it has to be put there.
+    # Looked up at call time: spawned worker processes swap __main__ after startup.
+    main_module = sys.modules["__main__"]
+    if not hasattr(main_module, "log1p_transform"):
+        main_module.log1p_transform = log1p_transform
+    return joblib.load(path)
+
+
+# Load a pipeline once per process and reload it when its joblib file changes
+def load_pipeline(name):
+    path = MODEL_PATHS[name]
+    mtime = os.path.getmtime(path)
+    with _lock:
+        cached = _pipelines.get(name)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        pipeline = None
+        # Use the loading-optimized export (python auth_util/artifacts.py) while it is current
+        if MODEL_FORMAT == "optimized":
+            from artifacts import load_optimized
+            pipeline = load_optimized(name)
+        if pipeline is None:
+            pipeline = load_joblib_pipeline(path)
+        _pipelines[name] = (mtime, pipeline)
+        return pipeline
+
+
+# Put raw customer rows into the shape and dtypes the pipelines were fitted on
+def prepare_features(df):
+    df = df[FEATURE_COLUMNS].copy()
+    # Only touch columns that need it, this runs on every single-row prediction too
+    for column in NUMERIC_COLUMNS:
+        if not pd.api.types.is_numeric_dtype(df[column]):
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+    for column in CATEGORICAL_COLUMNS:
+        if df[column].dtype != object:
+            df[column] = df[column].astype(object)
+    # The imputers only treat NaN as missing, a None (e.g. null in JSON) would be an unknown category
+    missing = df[CATEGORICAL_COLUMNS].isna()
+    if missing.values.any():
+        df[CATEGORICAL_COLUMNS] = df[CATEGORICAL_COLUMNS].mask(missing, np.nan)
+    return df
+
+
+# Churn probability for every row, preprocessed the same way as make_prediction
+def predict_proba(pipeline, df):
+    df = log1p_transform(prepare_features(df))
+    return pipeline.predict_proba(df)[:, 1]
+
+
+# Both pipelines predict churn when the positive class probability wins the argmax
+def label_from_proba(probability):
+    return (np.asarray(probability) > 0.5).astype(int)
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import inc
+from pipelines import MODEL_PATHS, FEATURE_COLUMNS, label_from_proba
+
+# Memoized predictions shared by every session in the process, keyed by model file version
+# and the canonical form of the customer row
+
+PREDICTION_CACHE_SIZE = int(os.environ.get("CHURN_PREDICTION_CACHE_SIZE", "10000"))
+# Seconds an entry stays valid; 0 keeps entries until they are evicted or the model changes
+PREDICTION_CACHE_TTL = float(os.environ.get("CHURN_PREDICTION_CACHE_TTL", "0"))
+
+
+# Values are keyed exactly as the pipeline receives them: only numbers (Python or numpy) are
+# normalized, so "Yes " and "Yes", which the encoders may treat differently, never share an entry
+def _canonical_value(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float, np.number, np.bool_)):
+        value = float(value)
+        # prepare_features turns None and NaN into the same missing value
+        return None if math.isnan(value) else value
+    return value if isinstance(value, str) else repr(value)
+
+
+# The feature values the prediction depends on, in a fixed order and with fixed types
+def canonical_row(row):
+    return [_canonical_value(row.get(column)) for column in FEATURE_COLUMNS]
+
+
+# Identity of the model file on disk; any rewrite of models/*.joblib changes it
+def model_version(name):
+    stat = os.stat(MODEL_PATHS[name])
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def cache_key(name, version, row):
+    payload = json.dumps([name, version, canonical_row(row)], separators=(",", ":"))
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+class PredictionCache:
+    def __init__(self, max_entries=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.versions = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _forget_model(self, name):
+        stale = [key for key, entry in self.entries.items() if entry["model"] == name]
+        for key in stale:
+            del self.entries[key]
+
+    def get(self, name, version, row):
+        key = cache_key(name, version, row)
+        with self.lock:
+            if self.versions.get(name) != version:
+                # The model file changed: nothing cached for the old file can be used again
+                self._forget_model(name)
+                self.versions[name] = version
+            entry = self.entries.get(key)
+            if entry is not None and self.ttl and time.time() - entry["created"] > self.ttl:
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                inc("churn_prediction_cache_total", result="miss")
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            inc("churn_prediction_cache_total", result="hit")
+            return entry["probability"], entry["prediction"]
+
+    def put(self, name, version, row, probability):
+        key = cache_key(name, version, row)
+        prediction = int(label_from_proba(probability))
+        with self.lock:
+            if self.versions.get(name, version) == version:
+                self.entries[key] = {"model": name, "probability": float(probability),
+                                     "prediction": prediction, "created": time.time()}
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+        return float(probability), prediction
+
+    # (probability, prediction) for the row, calling compute() -> probability only on a miss
+    def get_or_compute(self, name, row, compute):
+        version = model_version(name)
+        cached = self.get(name, version, row)
+        if cached is not None:
+            return cached
+        return self.put(name, version, row, compute())
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self.entries),
+                "evictions": self.evictions,
+            }
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+prediction_cache = PredictionCache()
@@ -0,0 +1,175 @@
+import argparse
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional
+
+import numpy as np
+import pandas as pd
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field
+
+from pipelines import MODEL_PATHS, FEATURE_COLUMNS, load_pipeline, predict_proba, label_from_proba
+from coalescer import coalescer
+from fast_path import compiled_for
+from warmup import run_warmup
+
+LATENCY_WINDOW = 10_000
+
+
+# Same fields as the Predict page form
+class Customer(BaseModel):
+    gender: str
+    Partner: str
+    Dependents: str
+    SeniorCitizen: int
+    MonthlyCharges: float
+    TotalCharges: Optional[float] = None
+    tenure: float
+    PhoneService: str
+    MultipleLines: Optional[str] = None
+    InternetService: str
+    OnlineSecurity: Optional[str] = None
+    OnlineBackup: Optional[str] = None
+    DeviceProtection: Optional[str] = None
+    TechSupport: Optional[str] = None
+    StreamingTV: Optional[str] = None
+    StreamingMovies: Optional[str] = None
+    Contract: str
+    PaperlessBilling: str
+    PaymentMethod: str
+
+
+class BatchRequest(BaseModel):
+    # An empty batch is a 422 rather than an empty frame the imputers reject
+    customers: List[Customer] = Field(..., min_length=1)
+
+
+class Prediction(BaseModel):
+    model: str
+    probability: float
+    prediction: Literal[0, 1]
+
+
+class BatchPrediction(BaseModel):
+    model: str
+    probabilities: List[float]
+    predictions: List[int]
+
+
+# Rolling window of request latencies per endpoint, for the /metrics percentiles
+class LatencyTracker:
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self.samples = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, seconds):
+        with self.lock:
+            self.samples.setdefault(endpoint, deque(maxlen=self.window)).append(seconds)
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+
+    def summary(self):
+        with self.lock:
+            snapshot = {endpoint: np.array(samples) for endpoint, samples in self.samples.items()}
+            counts = dict(self.counts)
+        return {
+            endpoint: {
+                "count": counts[endpoint],
+                "p50_ms": float(np.percentile(samples, 50) * 1000),
+                "p99_ms": float(np.percentile(samples, 99) * 1000),
+            }
+            for endpoint, samples in snapshot.items()
+        }
+
+
+latency = LatencyTracker()
+
+
+# Load and compile both pipelines once and push a row through each before accepting traffic
+@asynccontextmanager
+async def lifespan(app):
+    app.state.startup_timings = run_warmup()
+    yield
+
+
+# Plain ASGI middleware, BaseHTTPMiddleware adds a few ms to every request
+class LatencyMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = scope.get("route")
+            latency.record(route.path if route is not None else scope["path"], time.perf_counter() - start)
+
+
+app = FastAPI(title="Churn scoring service", lifespan=lifespan)
+app.state.coalesce = False
+app.add_middleware(LatencyMiddleware)
+
+
+def _pipeline(model):
+    if model not in MODEL_PATHS:
+        raise HTTPException(status_code=404, detail=f"Unknown model {model!r}, choose one of {list(MODEL_PATHS)}")
+    return load_pipeline(model)
+
+
+def _frame(customers):
+    return pd.DataFrame([customer.model_dump() for customer in customers], columns=FEATURE_COLUMNS)
+
+
+@app.post("/predict/{model}", response_model=Prediction)
+def predict(model: str, customer: Customer):
+    pipeline = _pipeline(model)
+    compiled = compiled_for(pipeline)
+    if app.state.coalesce:
+        probability = coalescer.predict_proba(pipeline, _frame([customer]))
+    elif compiled is not None:
+        probability = np.array([compiled.predict_proba_row(customer.model_dump())])
+    else:
+        probability = predict_proba(pipeline, _frame([customer]))
+    return Prediction(model=model, probability=float(probability[0]), prediction=int(label_from_proba(probability)[0]))
+
+
+@app.post("/predict/{model}/batch", response_model=BatchPrediction)
+def predict_batch(model: str, batch: BatchRequest):
+    probabilities = predict_proba(_pipeline(model), _frame(batch.customers))
+    return BatchPrediction(
+        model=model,
+        probabilities=probabilities.tolist(),
+        predictions=label_from_proba(probabilities).tolist(),
+    )
+
+
+@app.get("/metrics")
+def metrics():
+    return latency.summary()
+
+
+@app.get("/startup")
+def startup():
+    return app.state.startup_timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve churn predictions over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--coalesce", action="store_true",
+                        help="micro-batch concurrent single-row requests (CHURN_BATCH_WINDOW_MS / CHURN_BATCH_MAX_SIZE)")
+    args = parser.parse_args()
+    app.state.coalesce = args.coalesce
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+import argparse
+import base64
+import getpass
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Users and login sessions shared by every replica that sees the same Data directory.
+# Passwords are stored as salted PBKDF2 hashes. A session is a signed token
+# (payload.signature, HMAC-SHA256) kept in the tab's session state and in a SameSite cookie
+# (see auth.py), never in the URL, where it would end up in browser history, proxy logs and
+# shared links. Any replica can check it: an HMAC plus, at most once per
+# VALIDATION_CACHE_SECONDS, a lookup of whether it was revoked.
+
+AUTH_DB = os.environ.get("CHURN_AUTH_DB", "Data/auth.db")
+SECRET_PATH = os.environ.get("CHURN_AUTH_SECRET_FILE", "Data/.auth_secret")
+SESSION_HOURS = float(os.environ.get("CHURN_SESSION_HOURS", "8"))
+PBKDF2_ITERATIONS = 200_000
+VALIDATION_CACHE_SECONDS = 60
+VALIDATION_CACHE_SIZE = 10_000
+ROLES = ["admin", "analyst"]
+# Created on first use so the app keeps working out of the box; change its password with
+# python auth_util/sessions.py add-user admin --role admin
+DEFAULT_USERS = [("admin", "Admin01", "admin")]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password_hash TEXT NOT NULL,
+    role TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    username TEXT NOT NULL,
+    created REAL NOT NULL,
+    expires REAL NOT NULL,
+    revoked INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_sessions_username ON sessions (username);
+"""
+
+
+def hash_password(password, salt=None, iterations=PBKDF2_ITERATIONS):
+    salt = salt or secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return f"pbkdf2_sha256${iterations}${salt.hex()}${digest.hex()}"
+
+
+def verify_password(password, encoded):
+    _, iterations, salt, expected = encoded.split("$")
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), bytes.fromhex(salt), int(iterations))
+    return hmac.compare_digest(digest.hex(), expected)
+
+
+# Checked against when the username doesn't exist, so a wrong username takes as long as a wrong password
+_DUMMY_HASH = hash_password(secrets.token_hex(16))
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+# The signing key: CHURN_AUTH_SECRET, else a random key kept next to the database
+def load_secret(path=SECRET_PATH):
+    secret = os.environ.get("CHURN_AUTH_SECRET")
+    if secret:
+        return secret.encode()
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # Another process created it first; use theirs so both sign with the same key
+        with open(path, "rb") as f:
+            return f.read()
+    with os.fdopen(fd, "wb") as f:
+        secret = secrets.token_bytes(32)
+        f.write(secret)
+    return secret
+
+
+class SessionStore:
+    def __init__(self, path=AUTH_DB, secret=None):
+        self.path = path
+        self.secret = secret or load_secret()
+        self._local = threading.local()
+        self.cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connection() as connection:
+            connection.executescript(_SCHEMA)
+            if connection.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0:
+                for username, password, role in DEFAULT_USERS:
+                    connection.execute("INSERT OR IGNORE INTO users VALUES (?, ?, ?, ?)",
+                                       (username, hash_password(password), role, time.time()))
+
+    # sqlite3 connections can't be shared between threads, so keep one per thread
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def set_user(self, username, password, role="analyst"):
+        if role not in ROLES:
+            raise ValueError(f"Unknown role {role!r}, expected one of {ROLES}")
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT INTO users VALUES (?, ?, ?, ?) ON CONFLICT (username) "
+                "DO UPDATE SET password_hash = excluded.password_hash, role = excluded.role",
+                (username, hash_password(password), role, time.time()),
+            )
+
+    def remove_user(self, username):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM users WHERE username = ?", (username,))
+        self.revoke(username=username)
+
+    def users(self):
+        return self._connection().execute("SELECT username, role FROM users ORDER BY username").fetchall()
+
+    # The user's role if the password is right, else None
+    def authenticate(self, username, password):
+        row = self._connection().execute(
+            "SELECT password_hash, role FROM users WHERE username = ?", (username,)).fetchone()
+        valid = verify_password(password, row[0] if row else _DUMMY_HASH)
+        return row[1] if row and valid else None
+
+    def _sign(self, payload):
+        return _b64(hmac.new(self.secret, payload.encode(), hashlib.sha256).digest())
+
+    # The claims in a token's payload, without checking the signature; None if it doesn't parse
+    @staticmethod
+    def _claims(payload):
+        try:
+            claims = json.loads(_unb64(payload))
+        except (ValueError, TypeError, UnicodeDecodeError):
+            return None
+        return claims if isinstance(claims, dict) and isinstance(claims.get("sid"), str) else None
+
+    # A new signed session token for the user, or None for wrong credentials
+    def login(self, username, password, hours=SESSION_HOURS):
+        role = self.authenticate(username, password)
+        if role is None:
+            return None
+        now = time.time()
+        session_id = secrets.token_urlsafe(16)
+        expires = now + hours * 3600
+        with self._connection() as connection:
+            connection.execute("INSERT INTO sessions VALUES (?, ?, ?, ?, 0)", (session_id, username, now, expires))
+        payload = _b64(json.dumps({"sid": session_id, "user": username, "role": role, "exp": expires},
+                                  separators=(",", ":")).encode())
+        return f"{payload}.{self._sign(payload)}"
+
+    def _active(self, session_id):
+        # Joined with users so removing a user also ends their sessions
+        row = self._connection().execute(
+            "SELECT s.revoked, s.expires FROM sessions s JOIN users u ON u.username = s.username "
+            "WHERE s.id = ?", (session_id,)).fetchone()
+        return row is not None and not row[0] and row[1] > time.time()
+
+    # {"user", "role", "exp"} for a valid, unexpired and unrevoked token, else None
+    def validate(self, token):
+        if not isinstance(token, str) or token.count(".") != 1:
+            return None
+        payload, signature = token.split(".")
+        # Compared as bytes: compare_digest raises on str with non-ASCII characters
+        if not hmac.compare_digest(signature.encode("ascii", "ignore"), self._sign(payload).encode()):
+            return None
+        claims = self._claims(payload)
+        now = time.time()
+        if claims is None or not isinstance(claims.get("exp"), (int, float)) or claims["exp"] <= now:
+            return None
+        with self.cache_lock:
+            cached = self.cache.get(token)
+            if cached is not None and now - cached[1] < VALIDATION_CACHE_SECONDS:
+                self.cache.move_to_end(token)
+                return claims if cached[0] else None
+        active = self._active(claims["sid"])
+        with self.cache_lock:
+            self.cache[token] = (active, now)
+            self.cache.move_to_end(token)
+            while len(self.cache) > VALIDATION_CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return claims if active else None
+
+    # Revoke one token, or every session of a user; other replicas notice within
+    # VALIDATION_CACHE_SECONDS. A token that doesn't parse is ignored.
+    def revoke(self, token=None, username=None):
+        claims = self._claims(token.split(".")[0]) if isinstance(token, str) else None
+        with self._connection() as connection:
+            if claims is not None:
+                connection.execute("UPDATE sessions SET revoked = 1 WHERE id = ?", (claims["sid"],))
+            if username is not None:
+                connection.execute("UPDATE sessions SET revoked = 1 WHERE username = ?", (username,))
+        with self.cache_lock:
+            if token is not None:
+                self.cache.pop(token, None)
+            if username is not None:
+                self.cache.clear()
+
+    def purge_expired(self):
+        with self._connection() as connection:
+            return connection.execute("DELETE FROM sessions WHERE expires < ? OR revoked = 1", (time.time(),)).rowcount
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+# Process-wide store shared by every session
+def get_session_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SessionStore()
+        return _store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage app users and login sessions.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add-user", help="add a user or change their password/role")
+    add.add_argument("username")
+    add.add_argument("--role", choices=ROLES, default="analyst")
+    remove = commands.add_parser("remove-user", help="delete a user and revoke their sessions")
+    remove.add_argument("username")
+    revoke = commands.add_parser("revoke", help="log a user out everywhere")
+    revoke.add_argument("username")
+    commands.add_parser("list-users")
+    commands.add_parser("purge", help="delete expired and revoked sessions")
+    args = parser.parse_args()
+
+    store = get_session_store()
+    if args.command == "add-user":
+        password = getpass.getpass(f"Password for {args.username}: ")
+        if password != getpass.getpass("Repeat password: "):
+            parser.exit(1, "Passwords don't match\n")
+        store.set_user(args.username, password, args.role)
+        print(f"Saved {args.username} ({args.role})")
+    elif args.command == "remove-user":
+        store.remove_user(args.username)
+        print(f"Removed {args.username}")
+    elif args.command == "revoke":
+        store.revoke(username=args.username)
+        print(f"Revoked every session of {args.username}")
+    elif args.command == "list-users":
+        for username, role in store.users():
+            print(f"{username}\t{role}")
+    elif args.command == "purge":
+        print(f"Deleted {store.purge_expired()} sessions")
+
+
+if __name__ == "__main__":
+    main()
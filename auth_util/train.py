@@ -0,0 +1,299 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+import joblib
+import numpy as np
+
+from dataset import DATASET_PATH, dataset_version, load_dataset
+from pipelines import MODEL_PATHS, prepare_features
+from util import log1p_transform
+
+# Rebuilds both pipelines from the dataset with the structure of the ones in models/:
+# log1p -> median imputer -> RobustScaler for the numeric columns, most-frequent imputer ->
+# one-hot for the categorical ones (tenure is also one-hot encoded), SelectKBest(k="all") and
+# the classifier. Like at prediction time, TotalCharges is log1p'd before the pipeline too.
+# Each run writes a new version directory; --promote makes it the one the app loads.
+
+VERSIONS_DIR = "models/versions"
+TARGET = "Churn"
+RANDOM_STATE = 42
+TEST_SIZE = 0.2
+CV_FOLDS = 5
+CV_SCORING = ["roc_auc", "f1"]
+# Column lists of the fitted pipelines, in their original order
+PIPELINE_NUMERIC = ["tenure", "MonthlyCharges", "TotalCharges", "SeniorCitizen"]
+PIPELINE_CATEGORICAL = [
+    "gender", "Partner", "Dependents", "tenure", "PhoneService", "MultipleLines",
+    "InternetService", "OnlineSecurity", "OnlineBackup", "DeviceProtection",
+    "TechSupport", "StreamingTV", "StreamingMovies", "Contract",
+    "PaperlessBilling", "PaymentMethod"
+]
+# How often the stage monitor samples the resident set size
+RSS_SAMPLE_SECONDS = 0.05
+
+
+def _rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+# Wall time and peak resident memory of each stage. RSS is sampled from a thread because
+# CatBoost allocates outside the Python heap, where tracemalloc can't see it. Worker processes
+# of parallel cross-validation are not included.
+class StageTimer:
+    def __init__(self, log=print):
+        self.stages = {}
+        self.log = log
+
+    @contextmanager
+    def stage(self, name):
+        start_rss = peak = _rss_bytes()
+        done = threading.Event()
+
+        def sample():
+            nonlocal peak
+            while not done.wait(RSS_SAMPLE_SECONDS):
+                peak = max(peak, _rss_bytes())
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            done.set()
+            sampler.join()
+            peak = max(peak, _rss_bytes())
+            self.stages[name] = {"seconds": seconds, "peak_rss_mb": peak / 2**20,
+                                 "rss_growth_mb": (peak - start_rss) / 2**20}
+            self.log(f"{name:<28} {seconds:8.2f} s  peak RSS {peak / 2**20:8.1f} MB "
+                     f"(+{(peak - start_rss) / 2**20:.1f} MB)")
+
+
+def build_preprocessor():
+    from sklearn.compose import ColumnTransformer
+    from sklearn.impute import SimpleImputer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import FunctionTransformer, OneHotEncoder, RobustScaler
+
+    numeric = Pipeline(steps=[
+        ("log_transformer", FunctionTransformer(log1p_transform)),
+        ("num_imputer", SimpleImputer(strategy="median")),
+        ("num_scaler", RobustScaler()),
+    ])
+    categorical = Pipeline(steps=[
+        ("catg_imputer", SimpleImputer(strategy="most_frequent")),
+        ("catg_encoder", OneHotEncoder(handle_unknown="ignore")),
+    ])
+    return ColumnTransformer(transformers=[
+        ("num_preprocessor", numeric, PIPELINE_NUMERIC),
+        ("catg_preprocessor", categorical, PIPELINE_CATEGORICAL),
+    ])
+
+
+# Unfitted pipelines keyed like MODEL_PATHS; thread_count is CatBoost's training threads
+def build_pipelines(thread_count=-1, iterations=None):
+    from catboost import CatBoostClassifier
+    from sklearn.feature_selection import SelectKBest, mutual_info_classif
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+
+    def pipeline(name, classifier):
+        return Pipeline(steps=[
+            ("preprocessor", build_preprocessor()),
+            ("feature_selection", SelectKBest(mutual_info_classif, k="all")),
+            (name, classifier),
+        ])
+
+    # allow_writing_files=False: no catboost_info/ training logs in the working directory
+    catboost_params = {"logging_level": "Silent", "random_state": RANDOM_STATE, "class_weights": [1, 5],
+                       "thread_count": thread_count, "allow_writing_files": False}
+    if iterations:
+        catboost_params["iterations"] = iterations
+    return {
+        "Catboost": pipeline("Catclassifier", CatBoostClassifier(**catboost_params)),
+        "Logistic": pipeline("logistic_classifier", LogisticRegression(C=1, class_weight="balanced",
+                                                                       random_state=RANDOM_STATE)),
+    }
+
+
+# Features as the pipelines receive them at prediction time, and the encoded target
+def training_data(path=DATASET_PATH):
+    from sklearn.preprocessing import LabelEncoder
+
+    data = load_dataset(path)
+    data = data[data[TARGET].notna()]
+    encoder = LabelEncoder()
+    y = encoder.fit_transform(data[TARGET].astype(str))
+    X = log1p_transform(prepare_features(data))
+    return X, y, encoder
+
+
+def _holdout_metrics(pipeline, X, y):
+    from sklearn import metrics
+
+    probability = pipeline.predict_proba(X)[:, 1]
+    prediction = (probability > 0.5).astype(int)
+    return {
+        "accuracy": metrics.accuracy_score(y, prediction),
+        "precision": metrics.precision_score(y, prediction, zero_division=0),
+        "recall": metrics.recall_score(y, prediction),
+        "f1": metrics.f1_score(y, prediction),
+        "roc_auc": metrics.roc_auc_score(y, probability),
+        "log_loss": metrics.log_loss(y, probability),
+        "confusion_matrix": metrics.confusion_matrix(y, prediction).tolist(),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _versions():
+    import catboost
+    import imblearn
+    import pandas as pd
+    import sklearn
+
+    return {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "sklearn": sklearn.__version__, "catboost": catboost.__version__, "imblearn": imblearn.__version__}
+
+
+# Train every model, evaluate it with cross-validation and on a holdout split, and write the
+# fitted pipelines, the label encoder and metadata.json to a new version directory
+def train(models=tuple(MODEL_PATHS), path=DATASET_PATH, output_dir=VERSIONS_DIR, cv_folds=CV_FOLDS, cv_jobs=-1,
+          oversample=False, iterations=None, log=print):
+    from imblearn.over_sampling import RandomOverSampler
+    from imblearn.pipeline import make_pipeline
+    from joblib import cpu_count
+    from sklearn.base import clone
+    from sklearn.model_selection import StratifiedKFold, cross_validate, train_test_split
+
+    timer = StageTimer(log)
+    with timer.stage("load dataset"):
+        X, y, encoder = training_data(path)
+    with timer.stage("split"):
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=TEST_SIZE, stratify=y, random_state=RANDOM_STATE)
+    X_fit, y_fit = X_train, y_train
+    if oversample:
+        with timer.stage("oversample"):
+            X_fit, y_fit = RandomOverSampler(random_state=RANDOM_STATE).fit_resample(X_train, y_train)
+
+    # Parallel folds share the CPUs with CatBoost's own threads instead of oversubscribing them
+    jobs = cpu_count() if cv_jobs == -1 else max(1, cv_jobs)
+    jobs = min(jobs, cv_folds)
+    fold_threads = max(1, cpu_count() // jobs)
+    pipelines = build_pipelines(thread_count=-1, iterations=iterations)
+    fitted, metrics = {}, {}
+    for name in models:
+        pipeline = pipelines[name]
+        folds = clone(pipeline)
+        if name == "Catboost":
+            folds.set_params(Catclassifier__thread_count=fold_threads)
+        if oversample:
+            # Resampled inside each fold, so no duplicated row is scored against its own copy
+            folds = make_pipeline(RandomOverSampler(random_state=RANDOM_STATE), folds)
+        with timer.stage(f"cross-validate {name}"):
+            scores = cross_validate(folds, X_train, y_train, scoring=CV_SCORING, n_jobs=jobs,
+                                    cv=StratifiedKFold(cv_folds, shuffle=True, random_state=RANDOM_STATE))
+        with timer.stage(f"fit {name}"):
+            fitted[name] = pipeline.fit(X_fit, y_fit)
+        with timer.stage(f"evaluate {name}"):
+            metrics[name] = {
+                "cv": {metric: {"mean": float(scores[f"test_{metric}"].mean()), "std": float(scores[f"test_{metric}"].std())}
+                       for metric in CV_SCORING},
+                "holdout": _holdout_metrics(fitted[name], X_test, y_test),
+            }
+
+    version = time.strftime("%Y%m%d-%H%M%S")
+    directory = os.path.join(output_dir, version)
+    with timer.stage("write artifacts"):
+        os.makedirs(directory + ".tmp")
+        for name, pipeline in fitted.items():
+            joblib.dump(pipeline, os.path.join(directory + ".tmp", os.path.basename(MODEL_PATHS[name])))
+        joblib.dump(encoder, os.path.join(directory + ".tmp", "LabelEncoder.joblib"))
+        os.replace(directory + ".tmp", directory)
+
+    # Written last, so a version directory with metadata.json is complete
+    metadata = {
+        "version": version,
+        "created": time.time(),
+        "dataset": {"path": path, "sha256": dataset_version(path), "rows": int(len(y)),
+                    "train_rows": int(len(y_fit)), "test_rows": int(len(y_test)),
+                    "churn_rate": float(np.mean(y))},
+        "training": {"random_state": RANDOM_STATE, "test_size": TEST_SIZE, "cv_folds": cv_folds, "cv_jobs": jobs,
+                     "oversample": oversample, "catboost_iterations": iterations, "cpus": cpu_count()},
+        "classes": encoder.classes_.tolist(),
+        "git_commit": _git_commit(),
+        "libraries": _versions(),
+        "metrics": metrics,
+        "stages": timer.stages,
+    }
+    metadata_path = os.path.join(directory, "metadata.json")
+    with open(metadata_path + ".tmp", "w") as f:
+        json.dump(metadata, f, indent=2, default=float)
+    os.replace(metadata_path + ".tmp", metadata_path)
+    return directory, metadata
+
+
+# Copy a version's pipelines over the files the app loads; the new mtimes invalidate the
+# in-process pipeline, prediction and explanation caches
+def promote(directory):
+    for name, target in MODEL_PATHS.items():
+        source = os.path.join(directory, os.path.basename(target))
+        if os.path.exists(source):
+            shutil.copyfile(source, target + ".tmp")
+            os.replace(target + ".tmp", target)
+    encoder = os.path.join(directory, "LabelEncoder.joblib")
+    if os.path.exists(encoder):
+        shutil.copyfile(encoder, "models/LabelEncoder.joblib")
+
+
+def format_metrics(metrics):
+    lines = []
+    for name, result in metrics.items():
+        cv = ", ".join(f"{metric} {score['mean']:.3f}±{score['std']:.3f}" for metric, score in result["cv"].items())
+        holdout = result["holdout"]
+        lines.append(f"{name}: cv {cv}; holdout roc_auc {holdout['roc_auc']:.3f}, f1 {holdout['f1']:.3f}, "
+                     f"accuracy {holdout['accuracy']:.3f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrain the churn pipelines into a new version under models/versions.")
+    parser.add_argument("--model", choices=list(MODEL_PATHS), action="append", help="model to train (default: all)")
+    parser.add_argument("--dataset", default=DATASET_PATH)
+    parser.add_argument("--output", default=VERSIONS_DIR)
+    parser.add_argument("--cv-folds", type=int, default=CV_FOLDS)
+    parser.add_argument("--cv-jobs", type=int, default=-1, help="parallel cross-validation folds (-1: one per CPU)")
+    parser.add_argument("--oversample", action="store_true",
+                        help="balance the training split with RandomOverSampler (both models already weight the classes)")
+    parser.add_argument("--iterations", type=int, help="CatBoost iterations (default: CatBoost's 1000)")
+    parser.add_argument("--promote", action="store_true", help="replace models/*.joblib with the new version")
+    args = parser.parse_args()
+
+    directory, metadata = train(args.model or list(MODEL_PATHS), args.dataset, args.output, args.cv_folds,
+                                args.cv_jobs, args.oversample, args.iterations)
+    print(format_metrics(metadata["metrics"]))
+    total = sum(stage["seconds"] for stage in metadata["stages"].values())
+    peak = max(stage["peak_rss_mb"] for stage in metadata["stages"].values())
+    print(f"Wrote {directory} in {total:.1f} s, peak RSS {peak:.1f} MB")
+    if args.promote:
+        promote(directory)
+        print(f"Promoted {directory} to {', '.join(MODEL_PATHS.values())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from pipelines import MODEL_PATHS, EXAMPLE_CUSTOMER, load_pipeline, predict_proba
+
+# Loads, compiles and exercises every pipeline once per process, off the request path,
+# so the first real prediction after a deploy doesn't pay for imports and unpickling
+
+_state = {"status": "idle", "started": None, "finished": None, "timings": {}, "error": None}
+_thread = None
+_lock = threading.Lock()
+
+
+@contextmanager
+def _phase(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _state["timings"][name] = time.perf_counter() - start
+
+
+# Run every warm-up phase in the calling thread and return the per-phase timings in seconds
+def run_warmup(models=tuple(MODEL_PATHS)):
+    import pandas as pd
+
+    _state.update(status="running", started=time.time(), finished=None, error=None)
+    try:
+        with _phase("import sklearn/catboost"):
+            import catboost  # noqa: F401
+            import sklearn.pipeline  # noqa: F401
+        row = pd.DataFrame([EXAMPLE_CUSTOMER])
+        for model in models:
+            with _phase(f"load {model}"):
+                pipeline = load_pipeline(model)
+            with _phase(f"first prediction {model}"):
+                predict_proba(pipeline, row)
+            with _phase(f"compile {model}"):
+                from fast_path import compiled_for
+                compiled = compiled_for(pipeline)
+                if compiled is not None:
+                    compiled.predict_proba_row(EXAMPLE_CUSTOMER)
+            with _phase(f"global importance {model}"):
+                from explain import global_importance
+                global_importance(model)
+        _state["status"] = "ready"
+    except Exception as e:  # a failed warm-up only means the first request loads lazily
+        _state.update(status="failed", error=str(e))
+    finally:
+        _state["finished"] = time.time()
+    return dict(_state["timings"])
+
+
+# Start the background warm-up once per process; later calls are no-ops
+def start_warmup(models=tuple(MODEL_PATHS)):
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=run_warmup, args=(models,), name="churn-warmup", daemon=True)
+            _thread.start()
+    return _thread
+
+
+def wait_for_warmup(timeout=None):
+    if _thread is not None:
+        _thread.join(timeout)
+    return warmup_status()
+
+
+def warmup_status():
+    return {**_state, "timings": dict(_state["timings"])}
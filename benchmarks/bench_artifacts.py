@@ -0,0 +1,68 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter per sample so every load is cold for the process
+PROBE = r"""
+import json, os, sys, time
+sys.path.insert(0, "auth_util")
+os.environ["CHURN_MODEL_FORMAT"] = sys.argv[2]
+
+def memory():
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                fields[key] = int(value.split()[0])
+    return fields
+
+# Import everything up front so only deserialization is timed
+import catboost, pandas, sklearn.compose, sklearn.feature_selection, sklearn.impute
+import sklearn.linear_model, sklearn.pipeline, sklearn.preprocessing
+import artifacts
+from pipelines import load_pipeline
+before = memory()
+start = time.perf_counter()
+load_pipeline(sys.argv[1])
+seconds = time.perf_counter() - start
+after = memory()
+print(json.dumps({"seconds": seconds, **{key: after[key] - before[key] for key in after}}))
+"""
+
+
+def sample(model, model_format):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, model, model_format],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare model load time and memory: joblib vs optimized artifacts.")
+    parser.add_argument("--model", default="Catboost")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(ROOT, "models", "optimized", args.model, "manifest.json")):
+        sys.exit("Export the models first: python auth_util/artifacts.py")
+
+    print(f"{args.model}, {args.runs} cold loads per format (memory is the increase caused by the load)")
+    for model_format in ("joblib", "optimized"):
+        results = [sample(args.model, model_format) for _ in range(args.runs)]
+        seconds = np.median([r["seconds"] for r in results]) * 1000
+        rss = np.median([r["VmRSS"] for r in results])
+        anon = np.median([r["RssAnon"] for r in results])
+        file_backed = np.median([r["RssFile"] for r in results])
+        print(f"{model_format:>9}: load {seconds:7.1f} ms  RSS +{rss:,.0f} KB  (private +{anon:,.0f} KB, file-backed/shareable +{file_backed:,.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "auth_util"))
+os.chdir(ROOT)
+
+from coalescer import Coalescer  # noqa: E402
+from pipelines import MODEL_PATHS, load_pipeline, prepare_features  # noqa: E402
+from service_client import random_customer  # noqa: E402
+from util import log1p_transform  # noqa: E402
+
+
+# The pre-coalescer path: predict and predict_proba on every one-row frame
+def per_row(pipeline, df):
+    df = log1p_transform(prepare_features(df))
+    pipeline.predict(df)
+    return pipeline.predict_proba(df)[:, 1]
+
+
+def run(score, frames, concurrency):
+    def timed(df):
+        start = time.perf_counter()
+        score(df)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = np.array(list(pool.map(timed, frames)))
+    elapsed = time.perf_counter() - start
+    return {
+        "rows_per_second": len(frames) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-row scoring with the micro-batching coalescer.")
+    parser.add_argument("--model", choices=list(MODEL_PATHS), default="Catboost")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--window-ms", type=float, action="append", help="coalescer window (repeatable)")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    frames = [pd.DataFrame([random_customer(rng)]) for _ in range(args.requests)]
+    pipeline = load_pipeline(args.model)
+    per_row(pipeline, frames[0])
+
+    results = {"per-row": run(lambda df: per_row(pipeline, df), frames, args.concurrency)}
+    for window in args.window_ms or [1, 5, 20]:
+        coalescer = Coalescer(window_ms=window, max_batch_size=args.max_batch_size)
+        results[f"coalesced {window:g}ms"] = run(lambda df: coalescer.predict_proba(pipeline, df), frames, args.concurrency)
+        results[f"coalesced {window:g}ms"]["mean_batch"] = coalescer.rows / coalescer.batches
+
+    print(f"{args.model}, {args.requests} single-row requests from {args.concurrency} threads")
+    for name, result in results.items():
+        line = f"{name:>16}: {result['rows_per_second']:8,.0f} rows/s  p50 {result['p50_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms"
+        if "mean_batch" in result:
+            line += f"  mean batch {result['mean_batch']:.1f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "auth_util"))
+os.chdir(ROOT)
+
+import dataset  # noqa: E402
+
+# Each load runs in a fresh interpreter so the increase in RSS is only that load, split into
+# private memory (per session copy) and file-backed pages (shared between processes)
+PROBE = r"""
+import json, sys
+sys.path.insert(0, "auth_util")
+
+def memory():
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                fields[key] = int(value.split()[0])
+    return fields
+
+import pandas as pd, pyarrow as pa
+import dataset
+kind, path = sys.argv[1:3]
+before = memory()
+if kind == "pickle":
+    df = pd.read_pickle(path)
+else:
+    df = dataset.to_frame(pa.ipc.open_file(pa.memory_map(path)).read_all())
+# Touch every column so lazily mapped pages are counted
+df.apply(lambda column: column.nunique())
+after = memory()
+print(json.dumps({key: after[key] - before[key] for key in after}))
+"""
+
+
+# The dataset resampled to `rows` rows, in the dtypes pd.read_excel produces
+def legacy_dataset(rows):
+    data = pd.read_excel(dataset.DATASET_PATH)
+    data = data.sample(rows, replace=True, random_state=0).reset_index(drop=True)
+    data["customerID"] = [f"SYN-{i:08d}" for i in range(rows)]
+    return data
+
+
+def probe(kind, path):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, kind, path], cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the in-process memory of the customer dataset: object dtypes vs compact.")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent sessions to project memory for")
+    args = parser.parse_args()
+
+    legacy = legacy_dataset(args.rows)
+    compact = dataset.compact(legacy)
+    legacy_mb = legacy.memory_usage(deep=True).sum() / 2**20
+    compact_mb = compact.memory_usage(deep=True).sum() / 2**20
+    print(f"{args.rows:,} rows, DataFrame.memory_usage(deep=True)")
+    print(f"   object dtypes: {legacy_mb:9.1f} MB")
+    print(f"   compact dtypes: {compact_mb:8.1f} MB  ({legacy_mb / compact_mb:.1f}x smaller)")
+    for column in legacy.columns:
+        if legacy[column].dtype != compact[column].dtype:
+            print(f"     {column:<18} {str(legacy[column].dtype):>8} -> {compact[column].dtype}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pickle_path = os.path.join(tmp, "legacy.pkl")
+        arrow_path = os.path.join(tmp, "compact.arrow")
+        legacy.to_pickle(pickle_path)
+        dataset.write_arrow(compact, arrow_path)
+        del legacy, compact
+
+        print("RSS increase of one process loading the dataset (KB)")
+        results = {}
+        for kind, path in (("pickle", pickle_path), ("arrow", arrow_path)):
+            results[kind] = probe(kind, path)
+            r = results[kind]
+            label = "object dtypes" if kind == "pickle" else "compact, memory-mapped"
+            print(f"   {label:>23}: +{r['VmRSS']:,}  (private +{r['RssAnon']:,}, file-backed/shareable +{r['RssFile']:,})")
+
+    # Private memory is paid per process; file-backed pages are paid once through the page cache
+    print(f"Projected for {args.sessions} processes")
+    for kind, r in results.items():
+        total = (r["RssAnon"] * args.sessions + max(r["RssFile"], 0)) / 1024
+        print(f"   {kind:>6}: {total:9.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "auth_util"))
+os.chdir(ROOT)
+
+from batch import score_file  # noqa: E402
+from dataset import load_dataset  # noqa: E402
+from parallel_score import score_file_parallel  # noqa: E402
+from pipelines import FEATURE_COLUMNS  # noqa: E402
+
+
+# Write the dataset's feature columns repeated until the file has `rows` rows, one row
+# group per copy so the replica is never held in memory as a whole
+def replicate(path, rows):
+    table = pa.Table.from_pandas(load_dataset()[FEATURE_COLUMNS], preserve_index=False)
+    table = table.cast(pa.schema([field.with_type(pa.string()) if pa.types.is_dictionary(field.type) else field
+                                  for field in table.schema]))
+    written = 0
+    with pq.ParquetWriter(path, table.schema) as writer:
+        while written < rows:
+            part = table.slice(0, rows - written)
+            writer.write_table(part)
+            written += len(part)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how batch scoring scales with worker processes.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, action="append",
+                        help="worker counts to try (repeatable, default: 1, 2, 4, ... up to the CPU count)")
+    parser.add_argument("--model", default="Catboost")
+    args = parser.parse_args()
+
+    workers = args.workers or sorted({1 << i for i in range(os.cpu_count().bit_length())} | {os.cpu_count()})
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "customers.parquet")
+        replicate(source, args.rows)
+        print(f"{args.model}, {args.rows:,} rows, chunks of {args.chunksize:,}, {os.cpu_count()} CPUs")
+
+        start = time.perf_counter()
+        score_file(source, os.path.join(tmp, "serial.parquet"), models=(args.model,), chunksize=args.chunksize)
+        baseline = args.rows / (time.perf_counter() - start)
+        print(f"  serial: {baseline:12,.0f} rows/s end to end")
+        for count in workers:
+            stats = score_file_parallel(source, os.path.join(tmp, f"parallel-{count}.parquet"), models=(args.model,),
+                                        chunksize=args.chunksize, workers=count)
+            print(f"{count:3d} proc: {stats['rows_per_second']:12,.0f} rows/s end to end, "
+                  f"{stats['rows_per_second'] / baseline:5.2f}x serial")
+
+
+if __name__ == "__main__":
+    main()
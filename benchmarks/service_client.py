@@ -0,0 +1,115 @@
+import argparse
+import os
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def random_customer(rng):
+    tenure = rng.randint(0, 72)
+    monthly = round(rng.uniform(18, 120), 2)
+    return {
+        "gender": rng.choice(["Male", "Female"]),
+        "Partner": rng.choice(["Yes", "No"]),
+        "Dependents": rng.choice(["Yes", "No"]),
+        "SeniorCitizen": rng.choice([0, 1]),
+        "MonthlyCharges": monthly,
+        "TotalCharges": round(monthly * max(tenure, 1), 2),
+        "tenure": tenure,
+        "PhoneService": rng.choice(["Yes", "No"]),
+        "MultipleLines": rng.choice(["Yes", "No"]),
+        "InternetService": rng.choice(["DSL", "Fiber optic", "No"]),
+        "OnlineSecurity": rng.choice(["Yes", "No"]),
+        "OnlineBackup": rng.choice(["Yes", "No"]),
+        "DeviceProtection": rng.choice(["Yes", "No"]),
+        "TechSupport": rng.choice(["Yes", "No"]),
+        "StreamingTV": rng.choice(["Yes", "No"]),
+        "StreamingMovies": rng.choice(["Yes", "No"]),
+        "Contract": rng.choice(["Month-to-month", "One year", "Two year"]),
+        "PaperlessBilling": rng.choice(["Yes", "No"]),
+        "PaymentMethod": rng.choice(["Electronic check", "Mailed check", "Bank transfer (automatic)", "Credit card (automatic)"]),
+    }
+
+
+def wait_until_up(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(f"{url}/metrics", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Scoring service at {url} did not start")
+
+
+def run(url, model, requests, concurrency, batch_size, seed):
+    rng = random.Random(seed)
+    if batch_size > 1:
+        path = f"/predict/{model}/batch"
+        payloads = [{"customers": [random_customer(rng) for _ in range(batch_size)]} for _ in range(requests)]
+    else:
+        path = f"/predict/{model}"
+        payloads = [random_customer(rng) for _ in range(requests)]
+
+    with httpx.Client(base_url=url, limits=httpx.Limits(max_connections=concurrency)) as client:
+        def send(payload):
+            start = time.perf_counter()
+            client.post(path, json=payload).raise_for_status()
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = np.array(list(pool.map(send, payloads)))
+        elapsed = time.perf_counter() - start
+        server = client.get("/metrics").json()
+
+    return {
+        "requests": requests,
+        "rows_per_second": requests * batch_size / elapsed,
+        "client_p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "client_p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "server": server.get(path.replace(model, "{model}")),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the local churn scoring service.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--model", default="Catboost")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spawn", action="store_true", help="start the service in a subprocess for the run")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        port = args.url.rsplit(":", 1)[-1]
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "auth_util", "scoring_service.py"), "--port", port],
+            cwd=ROOT,
+        )
+    try:
+        wait_until_up(args.url)
+        result = run(args.url, args.model, args.requests, args.concurrency, args.batch_size, args.seed)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print(f"{args.model}: {result['rows_per_second']:,.0f} rows/s over {result['requests']} requests")
+    print(f"client latency p50 {result['client_p50_ms']:.2f} ms, p99 {result['client_p99_ms']:.2f} ms")
+    if result["server"]:
+        print(f"server latency p50 {result['server']['p50_ms']:.2f} ms, p99 {result['server']['p99_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+import argparse
+import cProfile
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "auth_util"))
+os.chdir(ROOT)
+
+import matplotlib  # noqa: E402
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+
+import charts  # noqa: E402
+import dataset  # noqa: E402
+from aggregates import build_aggregates  # noqa: E402
+from fast_path import compiled_for  # noqa: E402
+from pipelines import MODEL_PATHS, FEATURE_COLUMNS, load_pipeline, predict_proba, prepare_features  # noqa: E402
+from util import log1p_transform  # noqa: E402
+
+# Headless benchmarks of the app's hot paths: loading the dataset, the Predict page's
+# scoring and the Dashboard's aggregates and charts, on resampled copies of the dataset.
+
+DEFAULT_SIZES = [5_000, 50_000, 500_000]
+RESULTS_DIR = "benchmarks/results"
+
+# Timing differences below this are treated as noise when comparing runs
+NOISE_SECONDS = 0.001
+
+
+# A synthetic dataset of `rows` rows drawn with replacement from Lp2_df_coc.xlsx
+def synthetic_dataset(rows, seed=0):
+    data = dataset.load_dataset().sample(rows, replace=True, random_state=seed).reset_index(drop=True)
+    data["customerID"] = [f"SYN-{i:07d}" for i in range(rows)]
+    return data
+
+
+class Stage:
+    def __init__(self, name, rows, run, setup=tuple, number=1):
+        self.name = name
+        self.rows = rows
+        self.run = run
+        # setup() returns the arguments for run() and is not timed, e.g. a fresh copy to mutate
+        self.setup = setup
+        # run() calls per sample, for stages too quick to time one call at a time
+        self.number = number
+
+    def sample(self):
+        args = self.setup()
+        start = time.perf_counter()
+        for _ in range(self.number):
+            self.run(*args)
+        return (time.perf_counter() - start) / self.number
+
+
+def _render_dashboard(aggregates):
+    for build, args in [
+        (charts.churn_by_figure, ("Contract", "Distribution of Churn by Contract")),
+        (charts.churn_by_figure, ("PaymentMethod", "Distribution of Churn by Payment Method")),
+        (charts.distribution_figure, ("SeniorCitizen", "Distribution of SeniorCitizen")),
+        (charts.distribution_figure, ("PhoneService", "Distribution of PhoneService")),
+        (charts.distribution_figure, ("InternetService", "Distribution of InternetService")),
+        (charts.correlation_figure, ()),
+        (charts.contingency_figure, ("Contract", "Churn")),
+        (charts.contingency_figure, ("PaymentMethod", "Churn")),
+        (charts.contingency_figure, ("Contract", ["PaymentMethod", "Churn"])),
+        (charts.churn_by_figure, ("InternetService", "Impact of InternetService on Churn Rates", "group")),
+        (charts.churn_by_figure, ("PhoneService", "Impact of PhoneService on Churn Rates", "group")),
+    ]:
+        build(aggregates, *args).to_json()
+    for build in (charts.feature_distribution_figure, charts.service_by_contract_figure):
+        fig = build(aggregates)
+        fig.savefig(os.devnull, format="png")
+        plt.close(fig)
+    charts.kpis(aggregates)
+
+
+def _cold_load_dataset():
+    dataset._tables.clear()
+    dataset._frames.clear()
+    return dataset.load_dataset()
+
+
+# Every stage the suite runs, in order
+def plan(sizes, models):
+    stages = [
+        Stage("load: pd.read_excel", len(dataset.load_dataset()), pd.read_excel, setup=lambda: (dataset.DATASET_PATH,)),
+        Stage("load: arrow cache", len(dataset.load_dataset()), _cold_load_dataset),
+    ]
+    example = dataset.load_dataset().head(1)
+    row = example[FEATURE_COLUMNS].astype(object).where(example[FEATURE_COLUMNS].notna(), None).iloc[0].to_dict()
+    for model in models:
+        pipeline = load_pipeline(model)
+        compiled = compiled_for(pipeline)
+        stages.append(Stage(f"single row: predict_proba {model}", 1, lambda p=pipeline: predict_proba(p, example), number=50))
+        if compiled is not None:
+            stages.append(Stage(f"single row: compiled {model}", 1, lambda c=compiled: c.predict_proba_row(row), number=200))
+
+    for rows in sizes:
+        data = synthetic_dataset(rows)
+        features = prepare_features(data)
+        stages.append(Stage("prepare_features", rows, prepare_features, setup=lambda d=data: (d,)))
+        stages.append(Stage("log1p_transform", rows, log1p_transform, setup=lambda f=features: (f.copy(),)))
+        transformed = log1p_transform(features.copy())
+        for model in models:
+            pipeline = load_pipeline(model)
+            # The end-to-end call, then its two halves: fitted preprocessing and the estimator
+            stages.append(Stage(f"predict_proba {model}", rows, lambda p=pipeline, d=data: predict_proba(p, d)))
+            stages.append(Stage(f"predict_proba {model}: preprocessing", rows,
+                                lambda p=pipeline, t=transformed: p[:-1].transform(t)))
+            matrix = pipeline[:-1].transform(transformed)
+            stages.append(Stage(f"predict_proba {model}: estimator", rows,
+                                lambda p=pipeline, m=matrix: p[-1].predict_proba(m)))
+        stages.append(Stage("dashboard: build_aggregates", rows, build_aggregates, setup=lambda d=data: (d,)))
+        aggregates = build_aggregates(data)
+        stages.append(Stage("dashboard: render charts", rows, _render_dashboard, setup=lambda a=aggregates: (a,)))
+    return stages
+
+
+# Median/min wall time over `repeats` samples, then one traced sample for peak Python memory
+def measure(stage, repeats, profile_dir=None):
+    stage.sample()  # warm caches and lazy imports outside the measurements
+    seconds = [stage.sample() for _ in range(repeats)]
+
+    args = stage.setup()
+    tracemalloc.start()
+    stage.run(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    if profile_dir is not None:
+        args = stage.setup()
+        profiler = cProfile.Profile()
+        profiler.runcall(stage.run, *args)
+        name = "".join(c if c.isalnum() else "_" for c in stage.name)
+        profiler.dump_stats(os.path.join(profile_dir, f"{name}-{stage.rows}.prof"))
+
+    return {
+        "stage": stage.name,
+        "rows": stage.rows,
+        "seconds_median": float(np.median(seconds)),
+        "seconds_min": float(np.min(seconds)),
+        "repeats": repeats,
+        "peak_mb": peak / 2**20,
+    }
+
+
+def _environment():
+    import catboost
+    import sklearn
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "timestamp": time.time(),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "versions": {"pandas": pd.__version__, "numpy": np.__version__, "sklearn": sklearn.__version__,
+                     "catboost": catboost.__version__},
+    }
+
+
+def run_suite(sizes, models, repeats, profile_dir=None, log=print):
+    results = []
+    for stage in plan(sizes, models):
+        result = measure(stage, repeats, profile_dir)
+        log(f"{result['stage']:<42} {result['rows']:>9,} rows  {result['seconds_median'] * 1000:10.2f} ms  "
+            f"peak {result['peak_mb']:8.1f} MB")
+        results.append(result)
+    return {"environment": _environment(), "sizes": sizes, "results": results}
+
+
+# Stages of `current` slower (or using more memory) than in `baseline` by more than threshold
+def compare(baseline, current, threshold):
+    before = {(r["stage"], r["rows"]): r for r in baseline["results"]}
+    regressions = []
+    lines = []
+    for result in current["results"]:
+        old = before.get((result["stage"], result["rows"]))
+        if old is None:
+            continue
+        time_ratio = result["seconds_median"] / old["seconds_median"] if old["seconds_median"] else float("inf")
+        memory_ratio = result["peak_mb"] / old["peak_mb"] if old["peak_mb"] else 1.0
+        slower = time_ratio > 1 + threshold and result["seconds_median"] - old["seconds_median"] > NOISE_SECONDS
+        bigger = memory_ratio > 1 + threshold and result["peak_mb"] - old["peak_mb"] > 1
+        flag = "REGRESSION" if slower or bigger else ""
+        if flag:
+            regressions.append(result)
+        lines.append(f"{result['stage']:<42} {result['rows']:>9,} rows  time {time_ratio:6.2f}x  "
+                     f"memory {memory_ratio:6.2f}x  {flag}")
+    return regressions, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the prediction and dashboard hot paths without a browser.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="synthetic dataset sizes in rows")
+    parser.add_argument("--model", choices=list(MODEL_PATHS), action="append", help="model to benchmark (default: all)")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", help=f"JSON file for the results (default: {RESULTS_DIR}/<timestamp>.json)")
+    parser.add_argument("--profile", metavar="DIR", help="also write a cProfile .prof file per stage to DIR")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="compare two result files instead of running, exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown/growth ratio (default: 0.2)")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        regressions, lines = compare(baseline, current, args.threshold)
+        print("\n".join(lines))
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+        sys.exit(1 if regressions else 0)
+
+    if args.profile:
+        os.makedirs(args.profile, exist_ok=True)
+    results = run_suite(args.sizes, args.model or list(MODEL_PATHS), args.repeats, args.profile)
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,11 @@ import pyodbc
 import warnings
 warnings.filterwarnings("ignore")
 from auth import login_form, is_authenticated
+from dataset import ID_COLUMNS
+from data_source import get_source
+from pipelines import NUMERIC_COLUMNS, CATEGORICAL_COLUMNS
+from metrics import timed
+from page_metrics import instrumented_page
 
 st.set_page_config(
     page_icon="",
@@ -21,7 +26,13 @@ def data_page():
 
 
     
-        data = pd.DataFrame(pd.read_excel('Dataset/Lp2_df_coc.xlsx'))
+        # The xlsx by default, or the customer database (CHURN_DATA_SOURCE) through a shared pool
+        source = get_source()
+
+        # Per-column statistics computed once per dataset version
+        with timed("data.load_summaries"):
+            summaries = source.summaries()
+        columns = list(summaries["columns"])
 
 
         st.title("Explore Customer Data ⭐")
@@ -31,15 +42,37 @@ def data_page():
             """
         )
 
-        st.dataframe(data)
-
-        numeric_features = ["tenure", "MonthlyCharges", "TotalCharges", "SeniorCitizen"]
-        categorical_features = [
-            "gender", "Partner", "Dependents", "PhoneService", "MultipleLines",
-            "InternetService", "OnlineSecurity", "OnlineBackup", "DeviceProtection",
-            "TechSupport", "StreamingTV", "StreamingMovies", "Contract",
-            "PaperlessBilling", "PaymentMethod"
-        ]
+        # Filtering, sorting and paging run server-side; only the visible page goes to the browser
+        with st.expander("Filter and Sort"):
+            filters = {}
+            search = st.text_input("Search customerID")
+            if search:
+                filters["customerID"] = ("contains", search)
+            for column in st.multiselect("Filter columns", [c for c in columns if c not in ID_COLUMNS]):
+                summary = summaries["columns"][column]
+                if summary["values"] is not None:
+                    filters[column] = ("in", st.multiselect(column, summary["values"], default=summary["values"]))
+                elif summary["stats"]["min"] is not None:
+                    low, high = float(summary["stats"]["min"]), float(summary["stats"]["max"])
+                    filters[column] = ("range", st.slider(column, low, high, (low, high)))
+            sort_by = st.selectbox("Sort by", ["(none)"] + columns)
+            ascending = st.radio("Order", ["Ascending", "Descending"], horizontal=True) == "Ascending"
+
+        page_size = st.selectbox("Rows per page", [25, 50, 100, 250], index=1)
+        page = st.number_input("Page", min_value=1, value=1, step=1) - 1
+        sort_by = None if sort_by == "(none)" else sort_by
+        with timed("data.query_page"):
+            page_df, total = source.page(filters, sort_by, ascending, page * page_size, page_size)
+            pages = max(1, -(-total // page_size))
+            if page >= pages:
+                page = pages - 1
+                page_df, total = source.page(filters, sort_by, ascending, page * page_size, page_size)
+        st.dataframe(page_df)
+        st.caption(f"{total} matching customers, page {page + 1} of {pages}")
+
+        # The same feature lists the models and the drift monitor use
+        numeric_features = NUMERIC_COLUMNS
+        categorical_features = CATEGORICAL_COLUMNS
 
         selected_feature_type = st.radio(
             "Select Feature Type:",
@@ -91,11 +124,11 @@ def data_page():
             "PaperlessBilling": "📃 Whether the customer has paperless billing or not (Yes, No)",
             "PaymentMethod": "💳 The customer payment method (Electronic check, mailed check, Bank transfer(automatic), Credit card(automatic))"
         }
-        feature_explanation = st.selectbox("", data.columns)
+        feature_explanation = st.selectbox("", columns)
         st.write(
             f"{feature_explanation}: {column_descriptions.get(feature_explanation, 'No description available')}"
         )
-        st.write(f"{feature_explanation}: {data[feature_explanation].describe()}")
+        st.write(f"{feature_explanation}: {pd.Series(summaries['columns'][feature_explanation]['stats'], name=feature_explanation)}")
 
         st.markdown(
             """
@@ -113,4 +146,5 @@ def data_page():
         st.error("Please log in to access the App. Username: admin Password: Admin01")
 
 if __name__ == "__main__":
-    data_page()
+    with instrumented_page("data"):
+        data_page()
@@ -1,10 +1,14 @@
 import streamlit as st
-import pandas as pd 
-import plotly.express as px
-import seaborn as sns
-import matplotlib.pyplot as plt
 import pyodbc
 from auth import login_form, is_authenticated
+from data_source import get_source
+import charts
+from aggregates import churn_rate
+from figure_cache import figure_cache
+from live_aggregates import LIVE_DIMENSIONS, get_live_aggregates, live_table
+from pipelines import MODEL_PATHS
+from metrics import timed
+from page_metrics import instrumented_page
 
 st.set_page_config(
     page_icon= "📊",
@@ -22,130 +26,159 @@ def dashboard_page():
          """
         )
 
-        data = pd.DataFrame(pd.read_excel("Dataset/Lp2_df_coc.xlsx"))
+        # Counts, histograms and correlations computed once per dataset version
+        with timed("dashboard.load_aggregates"):
+            aggregates = get_source().aggregates()
+
+        # Rendered figures are shared across sessions, keyed by dataset version and chart parameters
+        def show_plotly(build, *args, **kwargs):
+            key = (aggregates["version"], build.__name__, repr(args), repr(sorted(kwargs.items())))
+            st.plotly_chart(figure_cache.plotly(key, lambda: build(aggregates, *args, **kwargs)))
+
+        def show_pyplot(build):
+            st.image(figure_cache.png((aggregates["version"], build.__name__), lambda: build(aggregates)))
 
         # EDA Dashboard
-        def create_eda_dashboard(data):
+        @timed("dashboard.create_eda_dashboard")
+        def create_eda_dashboard(aggregates):
           # Feature distribution
            st.subheader("Distribution of Features")
-           fig, axes = plt.subplots(figsize=(12, 8))
-           data.hist(ax=axes, grid=False, color="skyblue")
-           plt.tight_layout()
-           st.pyplot(fig)
-    
+           show_pyplot(charts.feature_distribution_figure)
 
           # Contract distribution
-           fig_contract = px.bar(data, x="Contract", color="Churn")
-           fig_contract.update_layout(title="Distribution of Churn by Contract")
-           st.plotly_chart(fig_contract)
+           show_plotly(charts.churn_by_figure, "Contract", "Distribution of Churn by Contract")
 
           # Payment method distribution
-           fig_payment = px.bar(data, x="PaymentMethod", color="Churn")
-           fig_payment.update_layout(title="Distribution of Churn by Payment Method")
-           st.plotly_chart(fig_payment)
+           show_plotly(charts.churn_by_figure, "PaymentMethod", "Distribution of Churn by Payment Method")
 
           # Distribution of SeniorCitizen
            st.subheader("Distribution of SeniorCitizen")
-           fig_senior = px.histogram(data, x="SeniorCitizen", color="SeniorCitizen", title="Distribution of SeniorCitizen")
-           st.plotly_chart(fig_senior)
-    
+           show_plotly(charts.distribution_figure, "SeniorCitizen", "Distribution of SeniorCitizen")
 
           # Distribution of PhoneService
            st.subheader("Distribution of PhoneService")
-           fig_phone = px.histogram(data, x="PhoneService", color="PhoneService", title="Distribution of PhoneService")
-           st.plotly_chart(fig_phone)
-   
+           show_plotly(charts.distribution_figure, "PhoneService", "Distribution of PhoneService")
+
           # Distribution of InternetService
            st.subheader("Distribution of InternetService")
-           fig_internet = px.histogram(data, x="InternetService", color="InternetService", title="Distribution of InternetService")
-           st.plotly_chart(fig_internet)
-    
-
-    
+           show_plotly(charts.distribution_figure, "InternetService", "Distribution of InternetService")
 
           # Relationship among features - Correlation Matrix
-           correlation_matrix = data.corr(numeric_only=True)
-
-          # Plot heatmap
            st.subheader("Correlation Matrix of Continuous Features")
-           fig_corr = px.imshow(correlation_matrix, color_continuous_scale='icefire')
-           st.plotly_chart(fig_corr)
-    
+           show_plotly(charts.correlation_figure)
 
-          # Create a contingency table for Contract and Churn
+          # Contingency table for Contract and Churn
            st.subheader("Contingency Table: Contract vs Churn")
-           contingency_table = pd.crosstab(data['Contract'], data['Churn'])
-           fig_contingency_contract = px.imshow(contingency_table, color_continuous_scale='icefire')
-           st.plotly_chart(fig_contingency_contract)
-    
+           show_plotly(charts.contingency_figure, "Contract", "Churn")
 
-          # Create a contingency table for PaymentMethod and Churn
+          # Contingency table for PaymentMethod and Churn
            st.subheader("Contingency Table: PaymentMethod vs Churn")
-           contingency_table2 = pd.crosstab(data['PaymentMethod'], data['Churn'])
-           fig_contingency_payment = px.imshow(contingency_table2, color_continuous_scale='icefire')
-           st.plotly_chart(fig_contingency_payment)
-    
+           show_plotly(charts.contingency_figure, "PaymentMethod", "Churn")
 
         # KPIs Dashboard
-        def create_kpis_dashboard(data):
+        @timed("dashboard.create_kpis_dashboard")
+        def create_kpis_dashboard(aggregates):
 
           # Contingency table
-            contingency_table3 = pd.crosstab(index=data['Contract'], columns=[data['PaymentMethod'], data['Churn']])
-          # Plot heatmap
-            fig_contingency3 = px.imshow(contingency_table3, color_continuous_scale='icefire')
             st.subheader('Correlation between Contract, Payment Method, and Churn')
-            st.plotly_chart(fig_contingency3)
-    
+            show_plotly(charts.contingency_figure, "Contract", ["PaymentMethod", "Churn"])
 
-    
-    
           # Bar plot for InternetService
-            fig_internet = px.bar(data, x='InternetService', color='Churn', barmode='group', color_discrete_map={True:'orange', False:'blue'})
-            fig_internet.update_layout(title='Impact of InternetService on Churn Rates')
-            st.plotly_chart(fig_internet)
+            show_plotly(charts.churn_by_figure, 'InternetService', 'Impact of InternetService on Churn Rates', barmode='group')
 
           # Bar plot for PhoneService
-            fig_phone = px.bar(data, x='PhoneService', color='Churn', barmode='group', color_discrete_map={True:'orange', False:'blue'})
-            fig_phone.update_layout(title='Impact of PhoneService on Churn Rates')
-            st.plotly_chart(fig_phone)
-    
+            show_plotly(charts.churn_by_figure, 'PhoneService', 'Impact of PhoneService on Churn Rates', barmode='group')
 
           # Subplots
-            fig, axes = plt.subplots(1, 2, figsize=(12, 6))
-            sns.countplot(x='Contract', hue='InternetService', data=data, palette={'Fiber optic':'orange','DSL':'blue','No':'red'}, ax=axes[0])
-            axes[0].set_title('Internet Service by Contract Term')
-            sns.countplot(x='Contract', hue='PhoneService', data=data, palette={"Yes":'orange', "No":'blue'}, ax=axes[1])
-            axes[1].set_title('Phone Service by Contract Term')
-            st.pyplot(fig)
-   
-        def create_kpis(data):
-            total_customers = len(data)
-            senior_customers = data[data['SeniorCitizen'] == 1].shape[0]
-            non_senior_customers = data[data['SeniorCitizen'] == 0].shape[0]
-            churn_rate = round((senior_customers / total_customers) * 100, 2)
+            show_pyplot(charts.service_by_contract_figure)
+
+        @timed("dashboard.create_kpis")
+        def create_kpis(aggregates):
+            total_customers, churn_customers, non_churn_customers, churn_rate_percent = charts.kpis(aggregates)
 
             col1, col2, col3, col4 = st.columns(4)
             col1.metric("Total Customers📊", total_customers )
-            col2.metric("Churn Customers📉", senior_customers)
-            col3.metric("Non-Churn Customers📈", non_senior_customers)
-            col4.metric("Churn Rate (%)", str(churn_rate) + "%")
-    
-    
-   
+            col2.metric("Churn Customers📉", churn_customers)
+            col3.metric("Non-Churn Customers📈", non_churn_customers)
+            col4.metric("Churn Rate (%)", str(churn_rate_percent) + "%")
+
+        # Training data next to every logged prediction, advanced only by the newly logged records
+        @timed("dashboard.create_live_dashboard")
+        def create_live_dashboard(aggregates):
+            live = get_live_aggregates()
+            live.refresh()
+            state = live.snapshot()
+            totals = state["totals"]
+
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Training Churn Rate (%)", f"{100 * churn_rate(aggregates):.2f}%")
+            col2.metric("Predictions Logged", totals["rows"])
+            col3.metric("Predicted Churn Rate (%)", f"{100 * totals['predicted_churn'] / totals['rows']:.2f}%" if totals["rows"] else "-")
+            col4.metric("Mean Churn Probability (%)", f"{100 * totals['probability_sum'] / totals['rows']:.2f}%" if totals["rows"] else "-")
+
+            for model, cell in sorted(state["models"].items()):
+                st.write(f"{model}: {cell['rows']} predictions, {100 * cell['predicted_churn'] / cell['rows']:.1f}% churn, "
+                         f"mean probability {100 * cell['probability_sum'] / cell['rows']:.1f}%")
+            for dimension in LIVE_DIMENSIONS:
+                table = live_table(aggregates, state, dimension)
+                st.subheader(f"Churn by {dimension}")
+                st.plotly_chart(charts.live_rates_figure(table, dimension))
+                st.dataframe(table)
+
+        # What drives each model's churn predictions across the dataset, computed once per model version
+        @timed("dashboard.create_drivers_dashboard")
+        def create_drivers_dashboard():
+            from explain import global_importance
+
+            for model in MODEL_PATHS:
+                importance = global_importance(model)
+                st.plotly_chart(charts.importance_figure(importance, model))
+                st.dataframe(importance)
+
+        # Predict page inputs against the training distribution, advanced only by the newly logged records
+        @timed("dashboard.create_drift_dashboard")
+        def create_drift_dashboard():
+            from drift import distribution, drift_scores, get_drift_monitor
+
+            monitor = get_drift_monitor()
+            monitor.refresh()
+            state = monitor.snapshot()
+            if not state["rows"]:
+                st.write("No predictions have been logged yet.")
+                return
+            scores = drift_scores(monitor.reference, state)
+            st.write(f"{state['rows']} logged predictions compared with {monitor.reference['rows']} training customers")
+            st.plotly_chart(charts.drift_scores_figure(scores))
+            st.dataframe(scores)
+            feature = st.selectbox("Feature", list(scores["feature"]))
+            st.plotly_chart(charts.drift_distribution_figure(distribution(monitor.reference, state, feature), feature))
 
         # Dashboard selection
         st.sidebar.header("Select Dashboard Type:")
-        dashboard_type = st.sidebar.selectbox("", ["EDA", "KPIs"])
+        dashboard_type = st.sidebar.selectbox("", ["EDA", "KPIs", "Live", "Drivers", "Drift"])
 
         if dashboard_type == "EDA":
-          create_eda_dashboard(data)
+          create_eda_dashboard(aggregates)
         elif dashboard_type == "KPIs":
-          create_kpis(data)
-          create_kpis_dashboard(data)
+          create_kpis(aggregates)
+          create_kpis_dashboard(aggregates)
+        elif dashboard_type == "Live":
+          create_live_dashboard(aggregates)
+        elif dashboard_type == "Drivers":
+          create_drivers_dashboard()
+        elif dashboard_type == "Drift":
+          create_drift_dashboard()
         else:
           st.error("Invalid dashboard type.")
+
+        stats = figure_cache.stats()
+        st.sidebar.caption(
+            f"Figure cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.0%} hit rate), {stats['entries']} figures, {stats['megabytes']:.1f} MB"
+        )
     else:
      st.error("Please log in to access the App. Username: admin Password: Admin01")
 
 if __name__ == "__main__":
-    dashboard_page()
+    with instrumented_page("dashboard"):
+        dashboard_page()
@@ -1,29 +1,20 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import joblib  
-import pyodbc
 import os as os
-from sklearn.preprocessing import LabelEncoder
-from catboost import CatBoostClassifier
-from imblearn.over_sampling import RandomOverSampler
-from sklearn.linear_model import LogisticRegression
+import io
 from  PIL import Image
 from auth import login_form, is_authenticated
+# The pickled pipelines look up log1p_transform on this (__main__) module
 from util import log1p_transform
+from pipelines import MODEL_PATHS, load_pipeline, label_from_proba
+from coalescer import coalescer
+from prediction_cache import prediction_cache
+from history_writer import history_writer
+from warmup import start_warmup, warmup_status
+from metrics import inc, timed
+from page_metrics import instrumented_page
 
-import streamlit as st
-import pandas as pd
-import numpy as np
-import joblib  
-import pyodbc
-import os as os
-from sklearn.preprocessing import LabelEncoder
-from catboost import CatBoostClassifier
-from imblearn.over_sampling import RandomOverSampler
-from sklearn.linear_model import LogisticRegression
-from PIL import Image
-
+# Heavy imports (sklearn, catboost, pyarrow) happen on first use or in the background warm-up
 
 
 st.set_page_config(
@@ -33,6 +24,7 @@ st.set_page_config(
 )
 
 def main():
+    start_warmup()
     login_form()
     if is_authenticated():
         st.title(f"**Predict Customer Churn ➡️**")
@@ -85,6 +77,7 @@ def main():
                 PaymentMethod = st.selectbox(label='PaymentMethod', options=['Electronic check', 'mailed check', 'Bank transfer(automatic)', 'Credit card(automatic)'])
                 MonthlyCharges = st.number_input(label='MonthlyCharges')
                 TotalCharges = st.number_input(label='TotalCharges')
+                compare_models = st.checkbox(label='Compare Catboost and Logistic')
                 submit_button = st.form_submit_button(label='Predict')
 
         if submit_button:
@@ -114,29 +107,37 @@ def main():
                     'PaymentMethod': PaymentMethod
             }, index=[0]) 
 
-            make_prediction(pipeline, df)
+            if compare_models:
+                compare_prediction(df)
+            else:
+                make_prediction(pipeline, df)
            
             # prediction and probability
-            if st.session_state.final_prediction is not None:
+            if not compare_models and st.session_state.final_prediction is not None:
                 st.write(f'💫 Prediction of the customer to churn: {st.session_state.final_prediction}')
                 st.write(f'✨ Probability that the customer will churn will be: {st.session_state.final_probability:.1f}%')
-        
+                show_drivers(df)
+
+        batch_scoring()
+        startup_timings()
+
     else:
         st.error("Please log in to access the App.")
 
-# Load CatBoost model
-@st.cache(allow_output_mutation=True)
+# Load CatBoost model (loaded once per process, usually already by the warm-up)
+@timed("predict.load_catboost")
 def load_catboost():
-    Catboost = joblib.load('models/catboost_pipeline.joblib')
+    Catboost = load_pipeline('Catboost')
     return Catboost
 
 # Load Logistic Regression model
-@st.cache(allow_output_mutation=True)
+@timed("predict.load_logistic")
 def load_logistic():
-    Logistic = joblib.load('models/logistic_pipeline.joblib')
+    Logistic = load_pipeline('Logistic')
     return Logistic
 
 # Function to select the appropriate model based on user input
+@timed("predict.select_model")
 def select_model(gender, Partner, Dependents, tenure, PhoneService, MultipleLines, InternetService, OnlineSecurity, OnlineBackup, DeviceProtection, TechSupport, StreamingTV, StreamingMovies, contract, PaperlessBilling, PaymentMethod):
     selected_model = st.session_state.get('selected_model', 'Catboost')
     pipeline, encoder = None, None
@@ -149,24 +150,124 @@ def select_model(gender, Partner, Dependents, tenure, PhoneService, MultipleLine
         st.error(f"An error occurred loading the model: {e}")
     return pipeline, encoder
 
-data = pd.DataFrame(pd.read_excel("Dataset/Lp2_df_coc.xlsx"))
-
 # Function to make prediction using the selected model
+@timed("predict.make_prediction")
 def make_prediction(pipeline, data):
     if pipeline is not None:
         df = pd.DataFrame(data)
-        df.to_csv('./Data/History.csv', mode='a', header=False, index=False if os.path.exists('./Data/History.csv') else True)
-        if not os.path.exists('./Data'):
-            os.mkdir("./Data")
-        df = log1p_transform(df)
+        model = st.session_state.get('selected_model', 'Catboost')
         try:  
-            prediction = pipeline.predict(df)[0]
-            churn_probability = pipeline.predict_proba(df)[0][1]  
+            # Repeated inputs are answered from the shared cache; new ones are scored together with
+            # concurrent requests from other sessions, one predict_proba per batch
+            churn_probability, prediction = prediction_cache.get_or_compute(
+                model, df.iloc[0].to_dict(), lambda: coalescer.predict_proba(pipeline, df)[0])
             prediction_label = "Churn😟" if prediction == 1 else "Not Churn😀"
             st.session_state.final_prediction = prediction_label
             st.session_state.final_probability = 100 * churn_probability
+            inc("churn_predictions_total", model=model, outcome='churn' if prediction == 1 else 'not_churn')
         except Exception as e:  # handling errors
             st.error(f"An error occurred making the prediction: {e}")
+            return
+        try:
+            # Queued for the background writer, the user doesn't wait for the disk
+            history_writer.submit([{
+                **df.iloc[0].to_dict(),
+                'model': model,
+                'probability': churn_probability,
+                'prediction': prediction,
+            }])
+        except Exception as e:  # the prediction is still shown if logging fails
+            st.warning(f"The prediction could not be saved to history: {e}")
+
+# Which answers pushed this customer's churn risk up or down for the selected model
+@timed("predict.show_drivers")
+def show_drivers(data):
+    from explain import explain_row, explanation_cache, top_drivers
+    import charts
+
+    model = st.session_state.get('selected_model', 'Catboost')
+    row = data.iloc[0].to_dict()
+    try:
+        drivers = top_drivers(explain_row(model, row), row)
+    except Exception as e:  # the prediction is still shown if the explanation fails
+        st.warning(f"The churn drivers could not be computed: {e}")
+        return
+    st.subheader('Top Churn Drivers🧭')
+    st.plotly_chart(charts.drivers_figure(drivers))
+    st.table(drivers.astype({'value': str}))
+    stats = explanation_cache.stats()
+    st.sidebar.caption(f"Explanation cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries")
+
+# Score the customer with both models side by side, sharing the preprocessing
+@timed("predict.compare_prediction")
+def compare_prediction(data):
+    from compare import score_row
+
+    try:
+        pipelines = {'Catboost': load_catboost(), 'Logistic': load_logistic()}
+        probabilities, timings = score_row(pipelines, data.iloc[0].to_dict())
+    except Exception as e:  # handling errors
+        st.error(f"An error occurred comparing the models: {e}")
+        return
+    predictions = {model: int(label_from_proba(p)) for model, p in probabilities.items()}
+    st.table(pd.DataFrame({
+        'Prediction': ["Churn😟" if predictions[model] == 1 else "Not Churn😀" for model in pipelines],
+        'Probability (%)': [round(100 * probabilities[model], 1) for model in pipelines],
+        'Model latency (ms)': [round(1000 * timings[model], 2) for model in pipelines],
+    }, index=list(pipelines)))
+    difference = abs(probabilities['Catboost'] - probabilities['Logistic'])
+    agreement = "agree" if predictions['Catboost'] == predictions['Logistic'] else "disagree"
+    st.write(f"🤝 The models {agreement}; probabilities differ by {100 * difference:.1f} points. "
+             f"Shared preprocessing took {1000 * timings['preprocessing']:.2f} ms.")
+    history_writer.submit([
+        {**data.iloc[0].to_dict(), 'model': model, 'probability': probabilities[model], 'prediction': predictions[model]}
+        for model in pipelines
+    ])
+
+# Score a whole uploaded file of customers in chunks
+def batch_scoring():
+    from batch import score_file, format_stats
+
+    st.header('**Batch Scoring**📂')
+    uploaded_file = st.file_uploader(label='Customers file (CSV or Parquet)', type=['csv', 'parquet'])
+    models = st.multiselect(label='Models', options=list(MODEL_PATHS), default=list(MODEL_PATHS))
+    compare_models = len(models) > 1 and st.checkbox(label='Report model agreement and latency')
+    if uploaded_file is not None and models and st.button('Score File'):
+        output = io.BytesIO()
+        try:
+            with st.spinner('Scoring customers...'):
+                stats, summary = score_file(uploaded_file, output, models=models, source_name=uploaded_file.name,
+                                            target_name='scored.csv', compare=compare_models)
+        except Exception as e:  # handling errors
+            st.error(f"An error occurred scoring the file: {e}")
+            return
+        st.text(format_stats(stats))
+        if summary is not None:
+            from compare import format_summary
+
+            st.text(format_summary(summary))
+        st.download_button(label='Download Scored File', data=output.getvalue(), file_name='scored_customers.csv', mime='text/csv')
+
+# Per-phase timings of this process's model warm-up
+def startup_timings():
+    stats = prediction_cache.stats()
+    st.sidebar.caption(
+        f"Prediction cache: {stats['hits']} hits, {stats['misses']} misses "
+        f"({stats['hit_rate']:.0%} hit rate), {stats['entries']} entries"
+    )
+    writer = history_writer.stats()
+    st.sidebar.caption(
+        f"History queue: {writer['depth']} pending, {writer['written']} written in {writer['batches']} batches, "
+        f"{writer['blocked']} blocked, {writer['spilled']} spilled"
+    )
+
+    status = warmup_status()
+    with st.sidebar.expander(f"Model warm-up: {status['status']}"):
+        for phase, seconds in status['timings'].items():
+            st.write(f"{phase}: {seconds:.2f}s")
+        if status['error']:
+            st.error(status['error'])
 
 if __name__ == "__main__":
-    main()
+    with instrumented_page("predict"):
+        main()
@@ -1,7 +1,11 @@
 import streamlit as st
 import pandas as pd 
 import plotly.express as px
+from datetime import datetime, time, timedelta
 from auth import login_form, is_authenticated
+from history import get_store
+from metrics import timed
+from page_metrics import instrumented_page
 
 
 st.set_page_config(
@@ -14,26 +18,49 @@ def history_page():
     login_form()
     if is_authenticated():
        st.title("**HISTORY**")
-       def user_predict_history():
-           file_path = "Data/History.csv"
-           try:
-               history_df = pd.read_csv(file_path, header=3)
-               history_df.columns = history_df.iloc[0]
-               history_df = history_df.iloc[1:]
-           except pd.errors.ParserError as e:
-               st.error(f"Error parsing CSV: {e}")
-               return None
-           return history_df
+       store = get_store()
+
+       # Filters are pushed down to indexed SQL queries, only one page is ever loaded
+       st.sidebar.header("Filter History:")
+       # The archive (python auth_util/history_compact.py) is read one monthly partition at a time
+       source = st.sidebar.radio("Source", ["Recent", "Archive"], horizontal=True)
+       # Rows of the old History.csv were never timestamped, so they can't fall in a date range
+       include_legacy = source == "Archive" and st.sidebar.checkbox("Include undated legacy records")
+       today = datetime.now().date()
+       date_range = st.sidebar.date_input("Date range", value=(today - timedelta(days=30), today))
+       models = st.sidebar.multiselect("Model", options=store.models())
+       outcome = st.sidebar.selectbox("Outcome", ["All", "Churn", "Not Churn"])
+       page_size = st.sidebar.selectbox("Rows per page", [25, 50, 100, 250], index=1)
+
+       @timed("history.user_predict_history")
+       def user_predict_history(page):
+           start, end = None, None
+           if len(date_range) == 2:
+               start = datetime.combine(date_range[0], time.min).timestamp()
+               end = datetime.combine(date_range[1] + timedelta(days=1), time.min).timestamp()
+           prediction = {"All": None, "Churn": 1, "Not Churn": 0}[outcome]
+           if source == "Archive":
+               from history_compact import query_archive
+
+               return query_archive(start, end, models, prediction, limit=page_size, offset=page * page_size,
+                                    include_legacy=include_legacy)
+           total = store.count(start, end, models, prediction)
+           history_df = store.query(start, end, models, prediction, limit=page_size, offset=page * page_size)
+           return history_df, total
 
        if __name__ == "__main__":
-            if st.button("Refresh Data"):
-               history_df = user_predict_history()
-               if history_df is not None:
-                  st.dataframe(history_df)
-               else:
-                  st.write("Unable to display history data due to errors.")
+            page = st.number_input("Page", min_value=1, value=1, step=1) - 1
+            st.button("Refresh Data")
+            history_df, total = user_predict_history(page)
+            pages = max(1, -(-total // page_size))
+            st.write(f"{total} predictions, page {page + 1} of {pages}")
+            if not history_df.empty:
+               st.dataframe(history_df)
+            else:
+               st.write("No predictions match these filters.")
     else:
      st.error("Please log in to access the App. Username: admin Password: Admin01")
 
 if __name__ == "__main__":
-    history_page()
\ No newline at end of file
+    with instrumented_page("history"):
+        history_page()
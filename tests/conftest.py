@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The app modules are imported flat from auth_util/, with paths relative to the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "auth_util"))
+os.chdir(ROOT)
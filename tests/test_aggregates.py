@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+from aggregates import build_aggregates, churn_rate
+from live_aggregates import _empty_state, live_table
+
+
+@pytest.fixture
+def aggregates():
+    data = pd.DataFrame({
+        "Contract": ["Month-to-month", "Month-to-month", "One year", "Two year"],
+        "PaymentMethod": ["Electronic check", "Mailed check", "Mailed check", "Bank transfer (automatic)"],
+        "InternetService": ["Fiber optic", "DSL", "DSL", "No"],
+        "PhoneService": ["Yes", "Yes", "No", "Yes"],
+        "SeniorCitizen": [1, 0, 0, 0],
+        "Churn": ["Yes", "Yes", "No", "No"],
+        "tenure": [1, 2, 30, 60],
+    })
+    return build_aggregates(data)
+
+
+# Regression: the live dashboard showed the SeniorCitizen share as the training churn rate
+def test_churn_rate_counts_churned_customers(aggregates):
+    assert churn_rate(aggregates) == 0.5
+
+
+def test_churn_rate_of_bundled_dataset():
+    from aggregates import load_aggregates
+
+    assert churn_rate(load_aggregates()) == pytest.approx(0.265, abs=0.001)
+
+
+def test_live_table_training_churn_rate(aggregates):
+    table = live_table(aggregates, _empty_state(), "Contract").set_index("Contract")
+    assert table.loc["Month-to-month", "training_churn_rate"] == 1.0
+    assert table.loc["One year", "training_churn_rate"] == 0.0
+    assert table["training_customers"].sum() == aggregates["rows"]
+
+
+# Regression: the KPI row reported senior citizens as churned customers
+def test_kpis_count_churned_customers(aggregates):
+    from charts import kpis
+
+    assert kpis(aggregates) == (4, 2, 2, 50.0)
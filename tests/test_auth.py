@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from auth import SESSION_COOKIE, cookie_token
+from sessions import SessionStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A fresh interpreter standing in for another replica: empty session state, only the request's
+# Cookie header to go on
+REPLICA = textwrap.dedent("""
+    import json, sys
+    sys.path.insert(0, "auth_util")
+    import streamlit as st
+    st.session_state = {}
+    import auth
+    auth._websocket_headers = lambda: {"Cookie": sys.argv[1]}
+    claims = auth.current_session()
+    print(json.dumps({"claims": claims, "admin": auth.is_admin()}))
+""")
+
+
+@pytest.fixture
+def auth_env(tmp_path):
+    return {"CHURN_AUTH_DB": str(tmp_path / "auth.db"), "CHURN_AUTH_SECRET": "shared-test-secret"}
+
+
+def replica(cookie, env):
+    result = subprocess.run([sys.executable, "-c", REPLICA, cookie], cwd=ROOT, env={**os.environ, **env},
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_cookie_token_parsing():
+    assert cookie_token({"Cookie": f"a=1; {SESSION_COOKIE}=abc.def; b=2"}) == "abc.def"
+    assert cookie_token({"cookie": f"{SESSION_COOKIE}=abc.def"}) == "abc.def"
+    assert cookie_token({"Cookie": "a=1"}) is None
+    assert cookie_token({}) is None
+    assert cookie_token({"Cookie": "\x00; ;;="}) is None
+
+
+def test_another_process_resumes_the_session_from_the_cookie(auth_env):
+    store = SessionStore(auth_env["CHURN_AUTH_DB"], secret=auth_env["CHURN_AUTH_SECRET"].encode())
+    token = store.login("admin", "Admin01")
+    resumed = replica(f"theme=dark; {SESSION_COOKIE}={token}", auth_env)
+    assert resumed["claims"]["user"] == "admin" and resumed["admin"] is True
+
+    store.revoke(token=token)
+    assert replica(f"{SESSION_COOKIE}={token}", auth_env)["claims"] is None
+    assert replica(f"{SESSION_COOKIE}=x.é", auth_env)["claims"] is None
@@ -0,0 +1,39 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch import score_file
+from compare import compare_file
+from dataset import load_dataset
+from pipelines import FEATURE_COLUMNS, MODEL_PATHS, load_pipeline, predict_proba
+
+
+@pytest.fixture(scope="module")
+def customers():
+    return load_dataset()[FEATURE_COLUMNS].head(300).reset_index(drop=True)
+
+
+def test_score_file_matches_each_pipeline(customers):
+    source = io.BytesIO(customers.to_csv(index=False).encode())
+    target = io.BytesIO()
+    stats, summary = score_file(source, target, chunksize=120, source_name="in.csv", target_name="out.csv")
+    assert summary is None
+    scored = pd.read_csv(io.BytesIO(target.getvalue()))
+    assert len(scored) == len(customers)
+    for model in MODEL_PATHS:
+        assert stats[model]["rows"] == len(customers)
+        expected = predict_proba(load_pipeline(model), pd.read_csv(io.BytesIO(customers.to_csv(index=False).encode())))
+        np.testing.assert_allclose(scored[f"{model}_probability"], expected, rtol=1e-9)
+
+
+# The agreement summary comes from the same pass, so the upload is read only once
+def test_score_file_compare_in_one_pass(customers):
+    data = customers.to_csv(index=False).encode()
+    stats, summary = score_file(io.BytesIO(data), io.BytesIO(), chunksize=120, source_name="in.csv",
+                                target_name="out.csv", compare=True)
+    expected = compare_file(io.BytesIO(data), chunksize=120, source_name="in.csv")
+    assert summary["rows"] == len(customers)
+    for key in ("agreement_rate", "mean_abs_difference", "max_abs_difference", "churn_rate"):
+        assert summary[key] == pytest.approx(expected[key])
@@ -0,0 +1,85 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from data_source import ConnectionPool, SQLSource, _sqlite_connect
+
+
+@pytest.fixture
+def customers():
+    return pd.DataFrame({
+        "customerID": [f"C{i:03d}" for i in range(50)],
+        "Contract": ["Month-to-month", "One year", "Two year", "One year", "Month-to-month"] * 10,
+        "PaymentMethod": ["Electronic check", "Mailed check"] * 25,
+        "tenure": list(range(50)),
+        "MonthlyCharges": [20.0 + i for i in range(50)],
+        "Churn": ["Yes", "No"] * 25,
+    })
+
+
+@pytest.fixture
+def source(tmp_path, customers):
+    path = str(tmp_path / "customers.db")
+    with sqlite3.connect(path) as conn:
+        customers.to_sql("customers", conn, index=False)
+    return SQLSource("sqlite", ConnectionPool(_sqlite_connect(path), size=2, timeout=0.5))
+
+
+# Regression: an abandoned generator kept its connection, so the third read blocked forever
+def test_abandoned_chunked_reads_return_their_connection(source):
+    for _ in range(5):
+        reader = source.read(chunksize=5)
+        next(reader)
+        reader.close()
+    assert source.pool.opened <= 2
+    assert len(source.load()) == 50
+
+
+def test_interrupted_read_discards_its_connection(source):
+    source.columns()
+    reader = source.read(chunksize=5)
+    next(reader)
+    with pytest.raises(KeyboardInterrupt):
+        reader.throw(KeyboardInterrupt)
+    assert source.pool.opened == 0
+    assert len(source.load()) == 50
+
+
+def test_pool_times_out_when_exhausted(source):
+    pool = source.pool
+    with pool.connection(), pool.connection():
+        with pytest.raises(TimeoutError):
+            with pool.connection():
+                pass
+    with pool.connection():
+        assert pool.opened == 2
+
+
+def test_filters_and_projection_are_pushed_down(source, customers):
+    filters = {"Contract": ("in", ["One year", "Two year"]), "tenure": ("range", (10, 30)),
+               "PaymentMethod": ("contains", "MAILED")}
+    loaded = source.load(columns=["customerID", "tenure"], filters=filters)
+    expected = customers[customers["Contract"].isin(["One year", "Two year"]) & customers["tenure"].between(10, 30)
+                         & customers["PaymentMethod"].str.lower().str.contains("mailed")]
+    assert list(loaded.columns) == ["customerID", "tenure"]
+    assert loaded["customerID"].tolist() == expected["customerID"].tolist()
+
+
+def test_contains_escapes_like_wildcards(source):
+    assert source.load(filters={"Contract": ("contains", "%")}).empty
+    assert source.load(filters={"Contract": ("in", [])}).empty
+
+
+def test_unknown_columns_are_rejected(source):
+    with pytest.raises(ValueError):
+        source.load(columns=['tenure" FROM customers; --'])
+    with pytest.raises(ValueError):
+        source.load(filters={"nope": ("in", ["x"])})
+
+
+def test_page_sorts_and_counts(source, customers):
+    page, total = source.page(filters={"Churn": ("in", ["Yes"])}, sort_by="tenure", ascending=False, offset=5, limit=10)
+    expected = customers[customers["Churn"] == "Yes"].sort_values("tenure", ascending=False).iloc[5:15]
+    assert total == 25
+    assert page["customerID"].tolist() == expected["customerID"].tolist()
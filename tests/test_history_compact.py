@@ -0,0 +1,118 @@
+import os
+from datetime import datetime
+
+import pytest
+
+import history_compact
+from history import HistoryStore
+from history_compact import apply_retention, partitions, query_archive, read_legacy, run
+from pipelines import EXAMPLE_CUSTOMER, FEATURE_COLUMNS
+
+
+def ts(year, month, day=15):
+    return datetime(year, month, day, 12).timestamp()
+
+
+def stats():
+    return {"read": 0, "written": 0, "duplicates": 0, "repaired": 0, "rejected": 0, "blank": 0, "headers": 0}
+
+
+def legacy_line(values):
+    return ",".join(str(values[column]) for column in FEATURE_COLUMNS)
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return {"archive_dir": str(tmp_path / "archive"), "legacy_csv": str(tmp_path / "History.csv"),
+            "history_db": str(tmp_path / "history.db")}
+
+
+def test_read_legacy_repairs_malformed_rows(tmp_path):
+    reordered = list(reversed(FEATURE_COLUMNS))
+    lines = [
+        legacy_line({**EXAMPLE_CUSTOMER, "MultipleLines": ""}),
+        "",
+        # A row written as the repr of a Python tuple
+        '"' + repr(tuple(str(EXAMPLE_CUSTOMER[column]) for column in FEATURE_COLUMNS)) + '"',
+        "too,few,fields",
+        # A header resets the column order of the lines after it
+        ",".join(reordered),
+        ",".join(str(EXAMPLE_CUSTOMER[column]) for column in reordered),
+    ]
+    path = tmp_path / "History.csv"
+    path.write_text("\n".join(lines) + "\n")
+    counts = stats()
+    records = [record for chunk in read_legacy(str(path), counts) for record in chunk]
+    assert counts["blank"] == 1 and counts["rejected"] == 1 and counts["headers"] == 1 and counts["repaired"] == 1
+    assert len(records) == 3
+    for record in records:
+        assert record["ts"] is None and record["source"] == "legacy_csv"
+        assert record["Contract"] == "Month-to-month" and record["tenure"] == 1.0
+    assert records[0]["MultipleLines"] is None
+
+
+def test_retention_removes_old_months_but_keeps_legacy(paths):
+    store = HistoryStore(paths["history_db"])
+    store.append([{**EXAMPLE_CUSTOMER, "ts": ts(2023, month), "model": "Catboost", "probability": 0.2, "prediction": 0}
+                  for month in (1, 6, 12)])
+    with open(paths["legacy_csv"], "w") as f:
+        f.write(legacy_line(EXAMPLE_CUSTOMER) + "\n")
+    run(**paths)
+    assert partitions(paths["archive_dir"]) == ["2023-01", "2023-06", "2023-12"]
+
+    removed = apply_retention(paths["archive_dir"], days=150, now=ts(2024, 1, 1))
+    assert removed == ["2023-01", "2023-06"]
+    assert partitions(paths["archive_dir"]) == ["2023-12"]
+    assert os.listdir(os.path.join(paths["archive_dir"], "legacy"))
+    _, total = query_archive(archive_dir=paths["archive_dir"], include_legacy=True)
+    assert total == 2
+
+
+def test_query_archive_reads_only_partitions_in_range(paths):
+    store = HistoryStore(paths["history_db"])
+    store.append([{**EXAMPLE_CUSTOMER, "ts": ts(2024, month), "model": model, "probability": 0.7, "prediction": 1}
+                  for month in (1, 2, 3) for model in ("Catboost", "Logistic")])
+    run(**paths)
+    # An unreadable file outside the range proves that partition is never opened
+    with open(os.path.join(paths["archive_dir"], "month=2024-01", "store-broken.parquet"), "w") as f:
+        f.write("not parquet")
+    df, total = query_archive(ts(2024, 2, 1), ts(2024, 4, 1), models=["Logistic"], archive_dir=paths["archive_dir"])
+    assert total == 2
+    assert set(df["model"]) == {"Logistic"}
+    assert list(df["ts"]) == sorted(df["ts"], reverse=True)
+    with pytest.raises(Exception):
+        query_archive(archive_dir=paths["archive_dir"])
+
+
+def test_legacy_rows_are_undated_and_only_read_on_request(paths):
+    with open(paths["legacy_csv"], "w") as f:
+        f.write(legacy_line(EXAMPLE_CUSTOMER) + "\n" + legacy_line({**EXAMPLE_CUSTOMER, "tenure": 5}) + "\n")
+    stats = run(**paths)
+    assert stats["written"] == 2 and stats["partitions"] == []
+    assert query_archive(archive_dir=paths["archive_dir"])[1] == 0
+    df, total = query_archive(ts(2024, 1, 1), ts(2024, 2, 1), archive_dir=paths["archive_dir"], include_legacy=True)
+    assert total == 2 and df["ts"].isna().all()
+
+
+def test_changed_legacy_csv_replaces_its_export(paths):
+    with open(paths["legacy_csv"], "w") as f:
+        f.write(legacy_line(EXAMPLE_CUSTOMER) + "\n")
+    run(**paths)
+    with open(paths["legacy_csv"], "a") as f:
+        f.write(legacy_line({**EXAMPLE_CUSTOMER, "tenure": 7}) + "\n")
+    os.utime(paths["legacy_csv"], ns=(0, os.stat(paths["legacy_csv"]).st_mtime_ns + 10**9))
+    run(**paths)
+    assert query_archive(archive_dir=paths["archive_dir"], include_legacy=True)[1] == 2
+
+
+# Regression: a repeated submit exported by the next run was written a second time
+def test_repeated_submit_split_across_runs_is_written_once(paths):
+    store = HistoryStore(paths["history_db"])
+    record = {**EXAMPLE_CUSTOMER, "model": "Catboost", "probability": 0.4, "prediction": 0}
+    start = ts(2024, 5) // history_compact.DEDUP_SECONDS * history_compact.DEDUP_SECONDS
+    store.append([{**record, "ts": start}])
+    assert run(**paths)["written"] == 1
+    store.append([{**record, "ts": start + 1}, {**record, "tenure": 9, "ts": start + 2}])
+    stats = run(**paths)
+    assert stats["duplicates"] == 1 and stats["written"] == 1
+    assert query_archive(archive_dir=paths["archive_dir"])[1] == 2
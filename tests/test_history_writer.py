@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+
+import history_writer
+from history import HistoryStore
+from history_writer import HistoryWriter
+from pipelines import EXAMPLE_CUSTOMER
+
+
+class RecordingStore:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+        self.release = threading.Event()
+        self.release.set()
+
+    def append(self, records):
+        self.release.wait()
+        if self.fail:
+            raise OSError("database is locked")
+        self.batches.append(list(records))
+
+
+def records(count, model="Catboost"):
+    return [{**EXAMPLE_CUSTOMER, "model": model, "probability": 0.5, "prediction": i % 2} for i in range(count)]
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(history_writer, "RETRY_SECONDS", 0.01)
+
+
+def test_records_are_written_in_batches(tmp_path):
+    store = RecordingStore()
+    store.release.clear()
+    writer = HistoryWriter(store, batch_size=3, flush_seconds=0.2, spill_path=str(tmp_path / "spill.jsonl"))
+    writer.submit(records(7))
+    store.release.set()
+    writer.close()
+    assert [len(batch) for batch in store.batches] == [3, 3, 1]
+    assert writer.stats()["written"] == 7 and writer.stats()["batches"] == 3
+
+
+def test_full_queue_blocks_instead_of_dropping(tmp_path):
+    store = RecordingStore()
+    store.release.clear()
+    writer = HistoryWriter(store, max_queue=2, batch_size=1, flush_seconds=0.01, spill_path=str(tmp_path / "spill.jsonl"))
+    submitter = threading.Thread(target=writer.submit, args=(records(6),))
+    submitter.start()
+    submitter.join(timeout=0.5)
+    assert submitter.is_alive(), "submit should wait while the queue is full"
+    store.release.set()
+    submitter.join(timeout=5)
+    writer.close()
+    assert writer.stats()["blocked"] > 0
+    assert sum(len(batch) for batch in store.batches) == 6
+
+
+def test_close_flushes_every_queued_record(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    writer = HistoryWriter(store, flush_seconds=0.05, spill_path=str(tmp_path / "spill.jsonl"))
+    writer.submit(records(25))
+    writer.close()
+    assert store.count() == 25
+
+
+# Regression: a batch the store refused at shutdown was only logged and then lost
+def test_unwritable_batch_is_spilled_and_replayed_on_next_start(tmp_path):
+    spill = tmp_path / "spill.jsonl"
+    failing = RecordingStore(fail=True)
+    writer = HistoryWriter(failing, flush_seconds=0.05, spill_path=str(spill))
+    with pytest.warns(UserWarning):
+        writer.submit(records(4, model="Logistic"))
+        writer.close()
+    assert writer.stats()["spilled"] == 4
+    assert len(spill.read_text().splitlines()) == 4
+
+    store = HistoryStore(str(tmp_path / "history.db"))
+    restarted = HistoryWriter(store, flush_seconds=0.05, spill_path=str(spill))
+    restarted.submit(records(1))
+    restarted.close()
+    assert store.count() == 5
+    assert store.count(models=["Logistic"]) == 4
+    assert restarted.stats()["replayed"] == 4
+    assert not spill.exists()
+
+
+def test_replay_keeps_records_the_store_still_refuses(tmp_path):
+    spill = tmp_path / "spill.jsonl"
+    with pytest.warns(UserWarning):
+        writer = HistoryWriter(RecordingStore(fail=True), flush_seconds=0.05, spill_path=str(spill))
+        writer.submit(records(2))
+        writer.close()
+        assert HistoryWriter(RecordingStore(fail=True), flush_seconds=0.05, spill_path=str(spill)).replay_spill() == 0
+    assert len(spill.read_text().splitlines()) == 2
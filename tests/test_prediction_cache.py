@@ -0,0 +1,39 @@
+import numpy as np
+
+from pipelines import EXAMPLE_CUSTOMER
+from prediction_cache import PredictionCache, cache_key
+
+
+def key(**changes):
+    return cache_key("Catboost", "v1", {**EXAMPLE_CUSTOMER, **changes})
+
+
+# Regression: whitespace was stripped, so "Yes " reused the cached result for "Yes"
+def test_surrounding_whitespace_gets_its_own_key():
+    assert key(Partner="Yes ") != key(Partner="Yes")
+    assert key(Contract=" Month-to-month") != key()
+
+
+def test_numbers_are_normalized_across_types():
+    assert key(tenure=1) == key(tenure=1.0) == key(tenure=np.int64(1)) == key(tenure=np.float32(1.0))
+    assert key(SeniorCitizen=0) == key(SeniorCitizen=np.int8(0))
+    assert key(TotalCharges=None) == key(TotalCharges=float("nan")) == key(TotalCharges=np.nan)
+
+
+def test_strings_are_not_coerced_to_numbers():
+    assert key(tenure="1") != key(tenure=1)
+    assert key(MultipleLines="None") != key(MultipleLines=None)
+
+
+def test_key_depends_on_model_and_version():
+    row = dict(EXAMPLE_CUSTOMER)
+    assert cache_key("Catboost", "v1", row) != cache_key("Logistic", "v1", row)
+    assert cache_key("Catboost", "v1", row) != cache_key("Catboost", "v2", row)
+
+
+def test_cache_hit_only_for_identical_input():
+    cache = PredictionCache(max_entries=10)
+    assert cache.get("Catboost", "v1", dict(EXAMPLE_CUSTOMER)) is None
+    cache.put("Catboost", "v1", dict(EXAMPLE_CUSTOMER), 0.25)
+    assert cache.get("Catboost", "v1", {**EXAMPLE_CUSTOMER, "tenure": 1.0}) is not None
+    assert cache.get("Catboost", "v1", {**EXAMPLE_CUSTOMER, "Partner": "Yes "}) is None
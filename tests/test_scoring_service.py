@@ -0,0 +1,42 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from scoring_service import app
+
+CUSTOMER = {
+    "gender": "Female", "Partner": "Yes", "Dependents": "No", "SeniorCitizen": 0,
+    "MonthlyCharges": 70.35, "TotalCharges": 1397.5, "tenure": 20, "PhoneService": "Yes",
+    "MultipleLines": "No", "InternetService": "Fiber optic", "OnlineSecurity": "No",
+    "OnlineBackup": "Yes", "DeviceProtection": "No", "TechSupport": "No", "StreamingTV": "Yes",
+    "StreamingMovies": "No", "Contract": "Month-to-month", "PaperlessBilling": "Yes",
+    "PaymentMethod": "Electronic check",
+}
+
+
+@pytest.fixture(scope="module")
+def client():
+    # Without the context manager the warm-up lifespan doesn't run; models load on first use
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("body", [{"customers": []}, {}, {"customers": None}])
+def test_batch_rejects_empty_or_missing_customers(client, body):
+    assert client.post("/predict/Catboost/batch", json=body).status_code == 422
+
+
+def test_batch_scores_every_customer(client):
+    response = client.post("/predict/Logistic/batch", json={"customers": [CUSTOMER, {**CUSTOMER, "TotalCharges": None}]})
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["probabilities"]) == len(body["predictions"]) == 2
+    assert all(0 <= probability <= 1 for probability in body["probabilities"])
+
+
+def test_batch_matches_single_prediction(client):
+    single = client.post("/predict/Catboost", json=CUSTOMER).json()
+    batch = client.post("/predict/Catboost/batch", json={"customers": [CUSTOMER]}).json()
+    assert batch["probabilities"][0] == pytest.approx(single["probability"])
+
+
+def test_batch_unknown_model(client):
+    assert client.post("/predict/Forest/batch", json={"customers": [CUSTOMER]}).status_code == 404
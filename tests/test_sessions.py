@@ -0,0 +1,44 @@
+import pytest
+
+from sessions import SessionStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SessionStore(path=str(tmp_path / "auth.db"), secret=b"test-secret")
+
+
+def test_login_and_validate(store):
+    token = store.login("admin", "Admin01")
+    claims = store.validate(token)
+    assert claims["user"] == "admin" and claims["role"] == "admin"
+    assert store.login("admin", "wrong") is None
+
+
+@pytest.mark.parametrize("token", [None, "", "x", "x.é", "é.é", "a.b.c", "abc.def", "!!!.@@@", 123])
+def test_validate_rejects_malformed_tokens(store, token):
+    assert store.validate(token) is None
+
+
+def test_validate_rejects_tampered_token(store):
+    payload, signature = store.login("admin", "Admin01").split(".")
+    forged = signature[:-1] + ("B" if signature.endswith("A") else "A")
+    assert store.validate(f"{payload}.{forged}") is None
+    assert SessionStore(path=store.path, secret=b"other-secret").validate(f"{payload}.{signature}") is None
+
+
+@pytest.mark.parametrize("token", ["garbage", "x.é", "é", "bm90IGpzb24.sig", "W10.sig", ""])
+def test_revoke_ignores_malformed_tokens(store, token):
+    valid = store.login("admin", "Admin01")
+    store.revoke(token=token)
+    assert store.validate(valid) is not None
+
+
+def test_revoke_token_and_user(store):
+    first = store.login("admin", "Admin01")
+    second = store.login("admin", "Admin01")
+    store.revoke(token=first)
+    assert store.validate(first) is None
+    assert store.validate(second) is not None
+    store.revoke(username="admin")
+    assert store.validate(second) is None